@@ -1,26 +1,51 @@
-from flask import Flask
+import os
+import sys
+
+# Code shared with the Tornado server lives in backend/shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import Flask, jsonify
 from flask_cors import CORS
 
-from extensions import db, jwt, migrate
+from extensions import (
+    db, jwt, migrate, token_cache, password_hasher, request_metrics, replica_router,
+    conversation_purger
+)
 from routes import register_blueprints
+from commands import register_commands
 from config import config_by_name
-from middlewares.auth_middleware import jwt_required_middleware
+from middlewares.auth_middleware import jwt_required_middleware, is_token_revoked
+from utils.password_hasher import HashingBusyError
+from utils.json_provider import get_json_provider_class
 
 def create_app(config_name="development"):
     app = Flask(__name__)
     app.config.from_object(config_by_name[config_name])
+    app.json = get_json_provider_class(app.config["JSON_PROVIDER"])(app)
 
-    # Initialize extensions
+    # Initialize extensions; metrics first so request timing includes auth
+    request_metrics.init_app(app)
     db.init_app(app)
+    replica_router.init_app(app)
+    conversation_purger.init_app(app, db)
     jwt.init_app(app)
+    # Tokens flask_jwt_extended verifies itself get the token cache's revocation check
+    jwt.token_in_blocklist_loader(is_token_revoked)
     migrate.init_app(app, db)
+    token_cache.init_app(app)
+    password_hasher.init_app(app)
 
-    # Register blueprints
+    # Register blueprints and CLI commands
     register_blueprints(app)
+    register_commands(app)
 
     # Register middleware
     app.before_request(jwt_required_middleware)
 
+    @app.errorhandler(HashingBusyError)
+    def handle_hashing_busy(e):
+        return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
     @app.route("/health")
     def health_check():
         return {"status": "healthy"}
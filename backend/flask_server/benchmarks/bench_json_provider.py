@@ -0,0 +1,85 @@
+"""
+Microbenchmark of the Flask JSON providers on a conversation detail payload.
+
+Compares the previous approach (str()/isoformat() in to_dict, then the
+default provider) against StdlibJSONProvider and OrjsonProvider on raw
+UUID/datetime values.
+
+Usage (from backend/flask_server):
+    python -m benchmarks.bench_json_provider [--messages N] [--iterations N]
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils.json_provider import StdlibJSONProvider, OrjsonProvider, orjson
+
+def make_payload(num_messages):
+    """Build a payload shaped like GET /api/conversations/<id> with raw column values."""
+    now = datetime.utcnow()
+    conversation_id = uuid.uuid4()
+    return {
+        "conversation": {
+            "id": conversation_id,
+            "user_id": uuid.uuid4(),
+            "title": "Benchmark conversation",
+            "created_at": now,
+            "updated_at": now,
+        },
+        "messages": [
+            {
+                "id": uuid.uuid4(),
+                "conversation_id": conversation_id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+                "created_at": now + timedelta(microseconds=i),
+            }
+            for i in range(num_messages)
+        ],
+        "next_cursor": None,
+    }
+
+def stringify(payload):
+    """What the models' to_dict used to do for every field."""
+    def convert(row):
+        return {k: (str(v) if isinstance(v, uuid.UUID) else v.isoformat() if isinstance(v, datetime) else v)
+                for k, v in row.items()}
+    return {
+        "conversation": convert(payload["conversation"]),
+        "messages": [convert(m) for m in payload["messages"]],
+        "next_cursor": payload["next_cursor"],
+    }
+
+def bench(name, fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<44} {elapsed * 1e6 / iterations:9.1f} us/response")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2_000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    payload = make_payload(args.messages)
+    default = DefaultJSONProvider(app)
+    stdlib = StdlibJSONProvider(app)
+
+    with app.app_context():
+        bench("default provider + str()/isoformat()", lambda: default.response(stringify(payload)), args.iterations)
+        bench("StdlibJSONProvider, raw values", lambda: stdlib.response(payload), args.iterations)
+        if orjson is not None:
+            fast = OrjsonProvider(app)
+            bench("OrjsonProvider, raw values", lambda: fast.response(payload), args.iterations)
+        else:
+            print("orjson is not installed; OrjsonProvider skipped")
+
+if __name__ == "__main__":
+    main()
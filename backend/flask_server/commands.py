@@ -0,0 +1,41 @@
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+
+from extensions import conversation_purger
+from utils.archive import create_message_partitions, archive_inactive_conversations
+
+maintenance_cli = AppGroup("maintenance", help="Database maintenance tasks.")
+
+@maintenance_cli.command("partitions")
+@click.option("--months-ahead", type=int, default=None, help="Months of partitions to keep ready.")
+def partitions(months_ahead):
+    """Create the monthly messages partitions that do not exist yet."""
+    if months_ahead is None:
+        months_ahead = current_app.config["MESSAGE_PARTITION_MONTHS_AHEAD"]
+    created = create_message_partitions(months_ahead)
+    click.echo(f"Created {created} message partitions")
+
+@maintenance_cli.command("archive")
+@click.option("--days", type=int, default=None, help="Archive conversations inactive this long.")
+@click.option("--batch-size", type=int, default=None, help="Conversations archived per transaction.")
+def archive(days, batch_size):
+    """Move inactive conversations into compressed archive storage."""
+    days = days or current_app.config["ARCHIVE_INACTIVE_DAYS"]
+    batch_size = batch_size or current_app.config["ARCHIVE_BATCH_SIZE"]
+    total = 0
+    while True:
+        archived = archive_inactive_conversations(days, batch_size)
+        total += archived
+        if archived < batch_size:
+            break
+    click.echo(f"Archived {total} conversations inactive for {days} days")
+
+@maintenance_cli.command("purge")
+def purge():
+    """Purge soft-deleted conversations left by an interrupted background worker."""
+    purged = conversation_purger.purge_all()
+    click.echo(f"Purged {purged} conversations")
+
+def register_commands(app: Flask):
+    app.cli.add_command(maintenance_cli)
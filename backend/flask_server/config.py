@@ -1,13 +1,64 @@
 import os
 from datetime import timedelta
 
+def replica_binds(urls):
+    """Return SQLALCHEMY_BINDS entries for a comma-separated list of replica URLs."""
+    urls = [url.strip() for url in urls.split(",") if url.strip()]
+    return {f"replica_{i}": url for i, url in enumerate(urls)}
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_key")
     DEBUG = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = SECRET_KEY
+    # Shared with the Tornado server, which verifies and signs tokens with it
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", SECRET_KEY)
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")  # auto, orjson or json
+    JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))
+    JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", 300))
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_SALT_LENGTH = int(os.getenv("PASSWORD_HASH_SALT_LENGTH", 16))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+    MESSAGE_BATCH_MAX_SIZE = int(os.getenv("MESSAGE_BATCH_MAX_SIZE", 500))
+    # Window around now for client supplied created_at; others get the server time
+    MESSAGE_CREATED_AT_MAX_AGE = int(os.getenv("MESSAGE_CREATED_AT_MAX_AGE", 7 * 24 * 3600))
+    MESSAGE_CREATED_AT_MAX_SKEW = int(os.getenv("MESSAGE_CREATED_AT_MAX_SKEW", 60))
+    CONVERSATION_PAGE_SIZE = int(os.getenv("CONVERSATION_PAGE_SIZE", 50))
+    MESSAGE_PAGE_SIZE = int(os.getenv("MESSAGE_PAGE_SIZE", 100))
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 200))
+    SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 20))
+    SEARCH_MAX_QUERY_LENGTH = int(os.getenv("SEARCH_MAX_QUERY_LENGTH", 200))
+
+    # Messages partitioning and cold-conversation archival
+    MESSAGE_PARTITION_MONTHS_AHEAD = int(os.getenv("MESSAGE_PARTITION_MONTHS_AHEAD", 3))
+    ARCHIVE_INACTIVE_DAYS = int(os.getenv("ARCHIVE_INACTIVE_DAYS", 90))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 100))
+
+    # Conversations with more messages are soft-deleted and purged in the background
+    CONVERSATION_PURGE_THRESHOLD = int(os.getenv("CONVERSATION_PURGE_THRESHOLD", 5000))
+    CONVERSATION_PURGE_CHUNK_SIZE = int(os.getenv("CONVERSATION_PURGE_CHUNK_SIZE", 1000))
+
+    # Connection pool settings, applied to the primary and every replica
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "connect_args": {
+            "options": f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))}",
+        },
+    }
+
+    # Read replicas for read-only endpoints, as comma-separated URLs
+    SQLALCHEMY_BINDS = replica_binds(os.getenv("DATABASE_REPLICA_URLS", ""))
+    DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", 5))
+    DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 5))
+    # Seconds a client reads from the primary after a write; keep above DB_REPLICA_MAX_LAG
+    DB_PRIMARY_PIN_SECONDS = float(os.getenv("DB_PRIMARY_PIN_SECONDS", 10))
 
 class DevelopmentConfig(Config):
     DEBUG = True
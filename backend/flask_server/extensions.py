@@ -2,6 +2,17 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 
-db = SQLAlchemy()
+from utils.token_cache import TokenCache
+from utils.password_hasher import PasswordHasher
+from utils.metrics import RequestMetrics
+from utils.db_routing import ReplicaRouter, RoutingSession
+from utils.conversation_purger import ConversationPurger
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
+token_cache = TokenCache()
+password_hasher = PasswordHasher()
+request_metrics = RequestMetrics()
+replica_router = ReplicaRouter()
+conversation_purger = ConversationPurger()
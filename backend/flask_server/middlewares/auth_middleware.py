@@ -1,18 +1,98 @@
 from functools import wraps
-from flask import request, jsonify, current_app
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask import request, jsonify, current_app, g
+import flask_jwt_extended
+from flask_jwt_extended import verify_jwt_in_request, decode_token
+from flask_jwt_extended.exceptions import RevokedTokenError, WrongTokenError
+
+from extensions import token_cache
+
+def set_revocation_check(check):
+    """
+    Register a callable taking token claims and returning True if the token is revoked.
+
+    It runs on every verified request: on token cache hits and misses, and
+    through flask_jwt_extended's blocklist callback for tokens it verifies.
+    """
+    token_cache.revocation_check = check
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """Blocklist callback for flask_jwt_extended, sharing the token cache's check."""
+    return token_cache.is_revoked(jwt_payload)
+
+def get_bearer_token():
+    """Return the raw JWT from the Authorization header, if any."""
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        return auth_header[len("Bearer "):]
+    return None
+
+def verify_cached_jwt_in_request():
+    """
+    Verify the request's access token, decoding it at most once per token.
+
+    Bearer tokens are decoded with flask_jwt_extended.decode_token, so the
+    app's JWT settings apply, and the claims are kept on `g` for get_jwt().
+    Tokens sent any other way are left to verify_jwt_in_request().
+    """
+    token = get_bearer_token()
+    if token is None:
+        verify_jwt_in_request()
+        g.jwt_verified = True
+        return
+
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        if claims.get("type") != "access":
+            raise WrongTokenError("Only non-refresh tokens are allowed")
+        if token_cache.is_revoked(claims):
+            raise RevokedTokenError(None, claims)
+        token_cache.put(token, claims)
+
+    g.jwt_claims = claims
+    g.jwt_verified = True
+
+def get_jwt():
+    """Return the claims of the access token verified for this request."""
+    claims = g.get("jwt_claims")
+    if claims is None:
+        return flask_jwt_extended.get_jwt()
+    return claims
+
+def get_jwt_identity():
+    """Return the identity of the access token verified for this request."""
+    return get_jwt().get(current_app.config.get("JWT_IDENTITY_CLAIM", "sub"))
 
 def jwt_required_middleware():
     # Skip authentication for these endpoints
     if request.path.startswith("/api/auth/login") or \
     request.path.startswith("/api/auth/register") or \
     request.path.startswith("/api/auth/refresh") or \
-    request.path == "/health":
+    request.path == "/health" or \
+    request.path == "/metrics":
         return
-    
+
     try:
-        verify_jwt_in_request()
+        verify_cached_jwt_in_request()
     except Exception as e:
         if request.path.startswith("/api/"):
             return jsonify({"error": "Authentication required"}), 401
-        
\ No newline at end of file
+
+def jwt_required(optional=False, fresh=False, refresh=False, locations=None):
+    """
+    Drop-in for flask_jwt_extended.jwt_required that reuses the middleware's verification.
+
+    Plain access-token routes go through the token cache; any other mode is
+    verified by flask_jwt_extended as usual.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            plain_access = not (optional or fresh or refresh or locations)
+            if not plain_access:
+                verify_jwt_in_request(optional, fresh, refresh, locations)
+            elif not g.get("jwt_verified"):
+                verify_cached_jwt_in_request()
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return decorator
+    return wrapper
@@ -12,16 +12,27 @@ class Conversation(db.Model):
     title = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Set while the messages live in conversation_archives
+    archived_at = db.Column(db.DateTime, nullable=True)
+    rehydrated_at = db.Column(db.DateTime, nullable=True)
+    # Set when a large conversation is waiting to be purged in the background
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("idx_conversations_user_updated", user_id, updated_at.desc(), id.desc()),
+    )
 
     user = db.relationship("User", back_populates="conversations")
-    messages = db.relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    # The database cascades deletes, so the ORM never loads messages to delete them
+    messages = db.relationship(
+        "Message", back_populates="conversation", cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         return {
-            "id": str(self.id),
-            "user_id": str(self.user_id),
+            "id": self.id,
+            "user_id": self.user_id,
             "title": self.title,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
     
\ No newline at end of file
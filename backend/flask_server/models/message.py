@@ -1,25 +1,35 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import deferred
 from extensions import db
 
 class Message(db.Model):
     __tablename__ = "messages"
 
+    # The table is partitioned by created_at, which is therefore part of the key
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    conversation_id = db.Column(UUID(as_uuid=True), db.ForeignKey("conversations.id"), nullable=False)
+    conversation_id = db.Column(UUID(as_uuid=True), db.ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     role = db.Column(db.String(50), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)
+    # Maintained by Postgres on insert; deferred so normal reads skip it
+    content_tsv = deferred(db.Column(
+        TSVECTOR, db.Computed("to_tsvector('english', content)", persisted=True)))
+
+    __table_args__ = (
+        db.Index("idx_messages_conversation_created", conversation_id, created_at, id),
+        db.Index("idx_messages_content_tsv", "content_tsv", postgresql_using="gin"),
+    )
 
     conversation = db.relationship("Conversation", back_populates="messages")
 
     def to_dict(self):
         return {
-            "id": str(self.id),
-            "conversation_id": str(self.conversation_id),
+            "id": self.id,
+            "conversation_id": self.conversation_id,
             "role": self.role,
             "content": self.content,
-            "created_at": self.created_at.isoformat(),
+            "created_at": self.created_at,
         }
\ No newline at end of file
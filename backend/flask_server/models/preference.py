@@ -15,8 +15,8 @@ class UserPreference(db.Model):
 
     def to_dict(self):
         return {
-            "user_id": str(self.user_id),
+            "user_id": self.user_id,
             "theme": self.theme,
             "model_preference": self.model_preference,
-            "updated_at": self.updated_at.isoformat()
+            "updated_at": self.updated_at
         }
\ No newline at end of file
@@ -1,10 +1,9 @@
 import uuid
 from datetime import datetime
 
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.dialects.postgresql import UUID
 
-from extensions import db
+from extensions import db, password_hasher
 
 class User(db.Model):
     __tablename__ = "users"
@@ -24,18 +23,26 @@ class User(db.Model):
         self.id = uuid.uuid4()
         self.username = username
         self.email = email
-        self.password_hash = generate_password_hash(password)
+        self.set_password(password)
+
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Check the password, upgrading the stored hash if the hash parameters changed."""
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     def to_dict(self):
         return {
-            "id": str(self.id),
+            "id": self.id,
             "username": self.username,
             "email": self.email,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat()
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
 
         
\ No newline at end of file
@@ -1,13 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import (
-    create_access_token, create_refresh_token,
-    jwt_required, get_jwt_identity
-)
+from flask_jwt_extended import create_access_token, create_refresh_token
 
 from models.user import User
 from models.preference import UserPreference
 from extensions import db
+from middlewares.auth_middleware import jwt_required, get_jwt_identity
 from utils.validators import validate_email, validate_password
+from utils.db_routing import read_only
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -78,6 +77,10 @@ def login():
             "error": "Invalid credentials"
         }), 401
     
+    # Persist a rehashed password if check_password upgraded it
+    if db.session.is_modified(user):
+        db.session.commit()
+
     # Generate tokens
     access_token = create_access_token(identity=str(user.id))
     refresh_token = create_refresh_token(identity=str(user.id))
@@ -101,6 +104,7 @@ def refresh():
     
 @auth_bp.route("/me", methods=["GET"])
 @jwt_required()
+@read_only
 def get_me():
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
@@ -1,37 +1,206 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
 
-from extensions import db
+from flask import Blueprint, request, jsonify, current_app, make_response
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+
+from extensions import db, conversation_purger
+from middlewares.auth_middleware import jwt_required, get_jwt_identity
 from models.conversations import Conversation
 from models.message import Message
+from utils.pagination import (
+    encode_cursor, decode_cursor, encode_score_cursor, decode_score_cursor, parse_limit
+)
+from utils.etag import make_etag, is_not_modified, with_etag
+from utils.db_routing import read_only, use_primary, reading_from_replica
+from utils.archive import rehydrate_conversation
 
 conversation_bp = Blueprint("conversation", __name__)
 
+# Must match the configuration of the messages.content_tsv column
+SEARCH_CONFIG = db.literal_column("'english'::regconfig")
+SNIPPET_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2"
+
+def get_page_params(default_limit):
+    """Read the `limit` and `cursor` query parameters, raising ValueError if invalid."""
+    limit = parse_limit(
+        request.args.get("limit"),
+        default_limit,
+        current_app.config["MAX_PAGE_SIZE"]
+    )
+    cursor = request.args.get("cursor")
+    return limit, decode_cursor(cursor) if cursor else None
+
 @conversation_bp.route("/", methods=["GET"])
 @jwt_required()
+@read_only
 def get_conversation():
     user_id = get_jwt_identity()
-    conversations = Conversation.query.filter_by(user_id=user_id).order_by(Conversation.updated_at.desc()).all()
+
+    try:
+        limit, after = get_page_params(current_app.config["CONVERSATION_PAGE_SIZE"])
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    # Answer polls with 304 when no conversation changed, before loading any rows
+    count, last_updated = db.session.query(
+        db.func.count(Conversation.id), db.func.max(Conversation.updated_at)
+    ).filter(Conversation.user_id == user_id, Conversation.deleted_at.is_(None)).one()
+    etag = make_etag(user_id, count, last_updated)
+    if is_not_modified(etag):
+        return with_etag(make_response("", 304), etag)
+
+    # Keyset pagination over (updated_at DESC, id DESC)
+    query = Conversation.query.filter_by(user_id=user_id, deleted_at=None)
+    if after:
+        query = query.filter(db.tuple_(Conversation.updated_at, Conversation.id) < after)
+    conversations = query.order_by(
+        Conversation.updated_at.desc(), Conversation.id.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        last = conversations[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+
+    response = jsonify({
+        "conversations": [conv.to_dict() for conv in conversations],
+        "next_cursor": next_cursor
+    })
+    return with_etag(response, etag), 200
+
+@conversation_bp.route("/search", methods=["GET"])
+@jwt_required()
+@read_only
+def search_conversations():
+    """Full-text search over the messages of the user's conversations, best matches first."""
+    user_id = get_jwt_identity()
+
+    query_text = (request.args.get("q") or "").strip()
+    if not query_text:
+        return jsonify({"error": "Missing search query"}), 400
+    if len(query_text) > current_app.config["SEARCH_MAX_QUERY_LENGTH"]:
+        return jsonify({"error": "Search query too long"}), 400
+
+    try:
+        limit = parse_limit(
+            request.args.get("limit"),
+            current_app.config["SEARCH_PAGE_SIZE"],
+            current_app.config["MAX_PAGE_SIZE"]
+        )
+        cursor = request.args.get("cursor")
+        after = decode_score_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    tsquery = db.func.websearch_to_tsquery(SEARCH_CONFIG, query_text)
+    # ts_rank_cd returns real; compared as float8 so the cursor's Python
+    # float matches exactly and rows tied with the last rank are not skipped
+    rank = db.cast(db.func.ts_rank_cd(Message.content_tsv, tsquery), DOUBLE_PRECISION)
+
+    # Keyset pagination over (rank DESC, id DESC), using the GIN index for the match
+    hits = db.session.query(
+        Message.id,
+        Message.conversation_id,
+        Message.role,
+        Message.content,
+        Message.created_at,
+        Conversation.title,
+        rank.label("rank")
+    ).join(Conversation, Conversation.id == Message.conversation_id).filter(
+        Conversation.user_id == user_id,
+        Conversation.deleted_at.is_(None),
+        Message.content_tsv.op("@@")(tsquery)
+    )
+    if after:
+        hits = hits.filter(db.tuple_(rank, Message.id) < after)
+    hits = hits.order_by(rank.desc(), Message.id.desc()).limit(limit + 1).subquery()
+
+    # Snippets are only built for the rows on this page
+    rows = db.session.query(
+        hits,
+        db.func.ts_headline(SEARCH_CONFIG, hits.c.content, tsquery, SNIPPET_OPTIONS).label("snippet")
+    ).order_by(hits.c.rank.desc(), hits.c.id.desc()).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_score_cursor(last.rank, last.id)
 
     return jsonify({
-        "conversations": [conv.to_dict() for conv in conversations]
+        "results": [{
+            "message_id": row.id,
+            "conversation_id": row.conversation_id,
+            "conversation_title": row.title,
+            "role": row.role,
+            "created_at": row.created_at,
+            "rank": row.rank,
+            "snippet": row.snippet,
+        } for row in rows],
+        "next_cursor": next_cursor
     }), 200
 
 @conversation_bp.route("/<conversation_id>", methods=["GET"])
 @jwt_required()
+@read_only
 def get_conversation_by_id(conversation_id):
     user_id = get_jwt_identity()
-    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+
+    try:
+        limit, after = get_page_params(current_app.config["MESSAGE_PAGE_SIZE"])
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    order = request.args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id, deleted_at=None).first()
+    if not conversation and reading_from_replica():
+        # It may have been created moments ago, e.g. over the WebSocket
+        use_primary()
+        conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id, deleted_at=None).first()
     
     if not conversation:
         return jsonify({"error": "Conversation not found"}), 404
+
+    if conversation.archived_at is not None:
+        rehydrate_conversation(conversation)
     
-    messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.created_at).all()
+    # Answer polls with 304 when nothing changed, before loading any message rows
+    count, last_created = db.session.query(
+        db.func.count(Message.id), db.func.max(Message.created_at)
+    ).filter(Message.conversation_id == conversation.id).one()
+    etag = make_etag(conversation.id, conversation.updated_at, count, last_created)
+    if is_not_modified(etag):
+        return with_etag(make_response("", 304), etag)
 
-    return jsonify({
+    # Keyset pagination over (created_at, id), oldest first unless order=desc
+    query = Message.query.filter_by(conversation_id=conversation_id)
+    sort_key = db.tuple_(Message.created_at, Message.id)
+    if order == "desc":
+        if after:
+            query = query.filter(sort_key < after)
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+    else:
+        if after:
+            query = query.filter(sort_key > after)
+        query = query.order_by(Message.created_at, Message.id)
+    messages = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        last = messages[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    response = jsonify({
         "conversation": conversation.to_dict(),
-        "messages": [msg.to_dict() for msg in messages]
-    }), 200
+        "messages": [msg.to_dict() for msg in messages],
+        "next_cursor": next_cursor
+    })
+    return with_etag(response, etag), 200
 
 @conversation_bp.route("/", methods=["POST"])
 @jwt_required()
@@ -53,7 +222,7 @@ def create_conversation():
 @jwt_required()
 def update_conversation(conversation_id):
     user_id = get_jwt_identity()
-    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id, deleted_at=None).first()
 
     if not conversation:
         return jsonify({"error": "Conversation not found"}), 404
@@ -74,12 +243,31 @@ def update_conversation(conversation_id):
 @jwt_required()
 def delete_conversation(conversation_id):
     user_id = get_jwt_identity()
-    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id, deleted_at=None).first()
     
     if not conversation:
         return jsonify({"error": "Conversation not found"}), 404
-    
-    db.session.delete(conversation)
+
+    # Count at most threshold + 1 messages so the check stays cheap
+    threshold = conversation_purger.threshold
+    message_count = db.session.query(db.func.count()).select_from(
+        db.session.query(Message.id)
+        .filter(Message.conversation_id == conversation.id)
+        .limit(threshold + 1)
+        .subquery()
+    ).scalar()
+
+    if message_count > threshold:
+        # Hide it now and delete the messages in the background
+        conversation.deleted_at = datetime.utcnow()
+        db.session.commit()
+        conversation_purger.notify()
+        return jsonify({
+            "message": "Conversation deletion scheduled"
+        }), 202
+
+    # One statement; the database cascades to the messages
+    Conversation.query.filter_by(id=conversation.id).delete(synchronize_session=False)
     db.session.commit()
     
     return jsonify({
@@ -1,12 +1,86 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.dialects.postgresql import insert
 
 from extensions import db
+from middlewares.auth_middleware import jwt_required, get_jwt_identity
 from models.conversations import Conversation
 from models.message import Message
 
 message_bp = Blueprint("message", __name__)
 
+def parse_created_at(data):
+    """
+    Return the client supplied creation time as naive UTC, or None if absent.
+
+    Raises ValueError if the value is not an ISO 8601 timestamp.
+    """
+    created_at = data.get("created_at")
+    if not created_at:
+        return None
+    created_at = datetime.fromisoformat(str(created_at))
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at
+
+def parse_message_id(data):
+    """Return the client supplied idempotency key as a UUID, or None if absent or invalid."""
+    message_id = data.get("id")
+    if not message_id:
+        return None
+    try:
+        return uuid.UUID(str(message_id))
+    except ValueError:
+        return None
+
+def parse_batch_message(item, default_created_at, earliest, latest):
+    """
+    Validate one message of a batch and return its row.
+
+    A created_at outside [earliest, latest] is replaced by
+    `default_created_at`, so clients cannot place rows in arbitrary partitions.
+
+    Raises ValueError describing the problem if the message is invalid.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Message must be an object")
+
+    conversation_id = item.get("conversation_id")
+    role = item.get("role")
+    content = item.get("content")
+
+    if not all([conversation_id, role, content]):
+        raise ValueError("Missing required fields")
+
+    if role not in ("user", "assistant", "system"):
+        raise ValueError("Invalid role")
+
+    try:
+        conversation_id = uuid.UUID(str(conversation_id))
+    except ValueError:
+        raise ValueError("Invalid conversation_id")
+
+    try:
+        created_at = parse_created_at(item)
+    except ValueError:
+        raise ValueError("Invalid created_at")
+    if created_at is None or not earliest <= created_at <= latest:
+        created_at = default_created_at
+
+    message_id = parse_message_id(item)
+    if item.get("id") and message_id is None:
+        raise ValueError("Invalid id")
+
+    return {
+        "id": message_id or uuid.uuid4(),
+        "conversation_id": conversation_id,
+        "role": role,
+        "content": content,
+        "created_at": created_at,
+    }
+
 @message_bp.route("/", methods=["POST"])
 @jwt_required()
 def create_message():
@@ -20,12 +94,24 @@ def create_message():
         return jsonify({"error": "Missing required fields"}), 400
     
     # Verify the conversation belongs to the user
-    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id, deleted_at=None).first()
     if not conversation:
         return jsonify({"error": "Conversation not found"}), 404
     
+    # A retried write with the same id returns the stored message
+    message_id = parse_message_id(data)
+    if message_id:
+        existing = Message.query.filter_by(id=message_id, conversation_id=conversation_id).first()
+        if existing:
+            return jsonify({
+                "message": "Message already exists",
+                "data": existing.to_dict()
+            }), 200
+
     # Stores user message
     message = Message(conversation_id=conversation_id, role="user", content=content)
+    if message_id:
+        message.id = message_id
     db.session.add(message)
 
     # Update conversation timestamp
@@ -51,16 +137,28 @@ def create_assistant_message():
         return jsonify({"error": "Missing required fields"}), 400
     
     # Verify the conversation belongs to the user
-    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+    conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id, deleted_at=None).first()
     if not conversation:
         return jsonify({"error": "Conversation not found"}), 404
     
+    # A retried write with the same id returns the stored message
+    message_id = parse_message_id(data)
+    if message_id:
+        existing = Message.query.filter_by(id=message_id, conversation_id=conversation_id).first()
+        if existing:
+            return jsonify({
+                "message": "Message already exists",
+                "data": existing.to_dict()
+            }), 200
+
     # Stores assistant message
     message = Message(
         conversation_id=conversation_id,
         role="assistant",
         content=content
     )
+    if message_id:
+        message.id = message_id
     db.session.add(message)
 
     # Update conversation timestamp
@@ -70,4 +168,88 @@ def create_assistant_message():
     return jsonify({
         "message": "Assistant message created successfully",
         "data": message.to_dict()
-    }), 201
\ No newline at end of file
+    }), 201
+
+@message_bp.route("/batch", methods=["POST"])
+@jwt_required()
+def create_messages_batch():
+    """Endpoint for storing many messages across conversations in one transaction"""
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    items = data.get("messages")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing required fields"}), 400
+
+    if len(items) > current_app.config["MESSAGE_BATCH_MAX_SIZE"]:
+        return jsonify({"error": "Too many messages in batch"}), 413
+
+    # Validate each message on its own; invalid ones are reported back and
+    # the rest are stored. Messages without an acceptable timestamp keep the
+    # batch order when sorting by created_at
+    now = datetime.utcnow()
+    earliest = now - timedelta(seconds=current_app.config["MESSAGE_CREATED_AT_MAX_AGE"])
+    latest = now + timedelta(seconds=current_app.config["MESSAGE_CREATED_AT_MAX_SKEW"])
+    rows = []
+    invalid = []
+    for index, item in enumerate(items):
+        try:
+            rows.append(parse_batch_message(
+                item, now + timedelta(microseconds=index), earliest, latest))
+        except ValueError as e:
+            message_id = item.get("id") if isinstance(item, dict) else None
+            invalid.append({"index": index, "id": message_id, "error": str(e)})
+
+    # Verify ownership of every referenced conversation with one query
+    conversation_ids = {row["conversation_id"] for row in rows}
+    owned = {
+        conv_id for (conv_id,) in db.session.query(Conversation.id).filter(
+            Conversation.id.in_(conversation_ids),
+            Conversation.user_id == user_id,
+            Conversation.deleted_at.is_(None)
+        )
+    }
+
+    accepted = [row for row in rows if row["conversation_id"] in owned]
+    rejected = [str(row["id"]) for row in rows if row["conversation_id"] not in owned]
+
+    inserted = []
+    if accepted:
+        # created_at is part of the primary key, so a retry with a different
+        # timestamp would not conflict; skip ids that are already stored, or
+        # repeated within the batch, before inserting
+        stored = {
+            message_id for (message_id,) in db.session.query(Message.id).filter(
+                Message.id.in_({row["id"] for row in accepted})
+            )
+        }
+        new_rows = []
+        for row in accepted:
+            if row["id"] not in stored:
+                stored.add(row["id"])
+                new_rows.append(row)
+
+        if new_rows:
+            # Multi-row insert; the conflict clause covers a concurrent retry
+            result = db.session.execute(
+                insert(Message)
+                .values(new_rows)
+                .on_conflict_do_nothing(index_elements=[Message.id, Message.created_at])
+                .returning(Message.id)
+            )
+            inserted = [str(message_id) for message_id in result.scalars()]
+
+        # Update each touched conversation's timestamp once
+        Conversation.query.filter(
+            Conversation.id.in_({row["conversation_id"] for row in accepted})
+        ).update({"updated_at": db.func.now()}, synchronize_session=False)
+
+    db.session.commit()
+
+    return jsonify({
+        "message": "Messages created successfully",
+        "ids": [str(row["id"]) for row in accepted],
+        "inserted": len(inserted),
+        "rejected": rejected,
+        "invalid": invalid
+    }), 201
@@ -1,20 +1,26 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash
 
 from extensions import db
+from middlewares.auth_middleware import jwt_required, get_jwt_identity
 from models.user import User
 from models.preference import UserPreference
 from utils.validators import validate_email, validate_password
+from utils.db_routing import read_only, use_primary
 
 user_bp = Blueprint("user", __name__)
 
 @user_bp.route("/preferences", methods=["GET"])
 @jwt_required()
+@read_only
 def get_preferences():
     user_id = get_jwt_identity()
     preferences = UserPreference.query.filter_by(user_id=user_id).first()
 
+    if not preferences:
+        # The replica may lag behind; check the primary before creating defaults
+        use_primary()
+        preferences = UserPreference.query.filter_by(user_id=user_id).first()
+
     if not preferences:
         # Create default preferences if not exist
         preferences = UserPreference(user_id=user_id)
@@ -87,7 +93,7 @@ def update_profile():
             return jsonify({
                 "error": "Password must be at least 8 characters long and contain letters and numbers"
             }), 400
-        user.password_hash = generate_password_hash(data["password"])
+        user.set_password(data["password"])
     
     db.session.commit()
 
@@ -0,0 +1,37 @@
+from sqlalchemy import text
+
+from extensions import db
+from utils.db_routing import use_primary
+
+def create_message_partitions(months_ahead):
+    """Create missing monthly message partitions; returns how many were created."""
+    created = db.session.execute(
+        text("SELECT create_message_partitions(:months_ahead)"),
+        {"months_ahead": months_ahead}
+    ).scalar()
+    db.session.commit()
+    return created
+
+def archive_inactive_conversations(inactive_days, batch_size):
+    """Archive one batch of inactive conversations; returns how many were archived."""
+    archived = db.session.execute(
+        text("SELECT archive_inactive_conversations(:inactive_days, :batch_size)"),
+        {"inactive_days": inactive_days, "batch_size": batch_size}
+    ).scalar()
+    db.session.commit()
+    return archived
+
+def rehydrate_conversation(conversation):
+    """
+    Move an archived conversation's messages back into the messages table.
+
+    The rest of the request reads from the primary, since replicas will not
+    have the restored rows yet.
+    """
+    use_primary()
+    db.session.execute(
+        text("SELECT rehydrate_conversation(:conversation_id)"),
+        {"conversation_id": conversation.id}
+    )
+    db.session.commit()
+    db.session.refresh(conversation)
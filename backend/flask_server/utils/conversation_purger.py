@@ -0,0 +1,131 @@
+import logging
+import threading
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+DELETE_MESSAGE_CHUNK = text("""
+    DELETE FROM messages
+    WHERE conversation_id = :conversation_id
+      AND (id, created_at) IN (
+          SELECT id, created_at FROM messages
+          WHERE conversation_id = :conversation_id
+          LIMIT :chunk_size
+      )
+""")
+
+# Soft-deleted conversations to try claiming, oldest deletion first
+PENDING_CONVERSATIONS = text("""
+    SELECT id FROM conversations
+    WHERE deleted_at IS NOT NULL
+    ORDER BY deleted_at
+    LIMIT :limit
+""")
+
+# Session-level advisory lock claiming a conversation for one purger across
+# every process; it survives the per-chunk commits on the same connection
+CLAIM_CONVERSATION = text(
+    "SELECT pg_try_advisory_lock(hashtext('conversation-purge'), hashtext(CAST(:conversation_id AS text)))"
+)
+RELEASE_CONVERSATION = text(
+    "SELECT pg_advisory_unlock(hashtext('conversation-purge'), hashtext(CAST(:conversation_id AS text)))"
+)
+
+class ConversationPurger:
+    """
+    Deletes soft-deleted conversations in the background, a chunk of messages at a time.
+
+    Each chunk is its own short transaction, so purging a huge conversation
+    never holds long locks or a long-running transaction. The worker thread
+    is started on the first soft delete in each process and then drains
+    every soft-deleted conversation, including ones left by a restart.
+    Every process runs a worker, so each conversation is claimed with an
+    advisory lock and purged by one of them only.
+    """
+
+    def __init__(self):
+        self.threshold = 5000
+        self.chunk_size = 1000
+        self._app = None
+        self._db = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        """Read the purge limits from the app configuration."""
+        self.threshold = app.config.get("CONVERSATION_PURGE_THRESHOLD", self.threshold)
+        self.chunk_size = app.config.get("CONVERSATION_PURGE_CHUNK_SIZE", self.chunk_size)
+        self._app = app
+        self._db = db
+
+    def notify(self):
+        """Wake the worker after a conversation was soft-deleted."""
+        # Started lazily so each forked WSGI worker gets its own thread
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="conversation-purger", daemon=True)
+                    self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._app.app_context():
+                try:
+                    self.purge_all()
+                except Exception as e:
+                    logger.exception(f"Error purging deleted conversations: {e}")
+
+    def purge_all(self):
+        """Purge every soft-deleted conversation no other process is purging; returns how many."""
+        purged = 0
+        # One connection for the whole run, since the claim is held by the
+        # database session rather than a transaction
+        with self._db.engine.connect() as connection:
+            while True:
+                conversation_id = self._claim(connection)
+                if conversation_id is None:
+                    return purged
+                try:
+                    self._purge_conversation(connection, conversation_id)
+                finally:
+                    connection.rollback()
+                    connection.execute(RELEASE_CONVERSATION, {"conversation_id": conversation_id})
+                    connection.commit()
+                purged += 1
+
+    def _claim(self, connection, batch=100):
+        """Return the id of a pending conversation now locked by this connection, or None."""
+        pending = connection.execute(PENDING_CONVERSATIONS, {"limit": batch}).scalars().all()
+        connection.commit()
+        for conversation_id in pending:
+            claimed = connection.execute(
+                CLAIM_CONVERSATION, {"conversation_id": conversation_id}).scalar()
+            connection.commit()
+            if claimed:
+                return conversation_id
+        return None
+
+    def _purge_conversation(self, connection, conversation_id):
+        """Delete a claimed conversation's messages in chunks, then the conversation itself."""
+        while True:
+            deleted = connection.execute(
+                DELETE_MESSAGE_CHUNK,
+                {"conversation_id": conversation_id, "chunk_size": self.chunk_size}
+            ).rowcount
+            connection.commit()
+            # A short chunk can still leave rows behind; only an empty one means done
+            if deleted == 0:
+                break
+
+        connection.execute(
+            text("DELETE FROM conversations WHERE id = :conversation_id AND deleted_at IS NOT NULL"),
+            {"conversation_id": conversation_id}
+        )
+        connection.commit()
+        logger.info(f"Purged conversation {conversation_id}")
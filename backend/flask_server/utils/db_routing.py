@@ -0,0 +1,153 @@
+import itertools
+import logging
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind; zero when it has replayed everything it received
+REPLICA_LAG_SQL = text("""
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END, 0)
+""")
+
+# Cookie holding the time until which a client that wrote reads from the primary
+PRIMARY_PIN_COOKIE = "db_primary_until"
+# Header asking for primary reads, e.g. from the Tornado server after its own writes
+READ_PRIMARY_HEADER = "X-Read-Primary"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+def is_pinned_to_primary():
+    """Return True if this request must read its own recent writes."""
+    if request.headers.get(READ_PRIMARY_HEADER):
+        return True
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_only(fn):
+    """
+    Mark a view as read-only so its SELECTs may be served by a replica.
+
+    Clients pinned to the primary after a recent write keep reading from it.
+    """
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        g.db_read_only = not is_pinned_to_primary()
+        return fn(*args, **kwargs)
+    return decorator
+
+def use_primary():
+    """Send the rest of this request's queries to the primary, e.g. before a write."""
+    g.db_read_only = False
+
+def reading_from_replica():
+    """Return True if this request's reads have been served by a replica."""
+    return bool(g.get("db_read_only")) and g.get("db_replica") is not None
+
+class ReplicaRouter:
+    """
+    Picks a read replica for read-only requests.
+
+    Replicas are used round robin. Each one's replication lag is checked at
+    most every `check_interval` seconds, and replicas that are too far
+    behind or unreachable are skipped. With none left, reads fall back to
+    the primary. Clients that just wrote are pinned to the primary for
+    `pin_seconds` by a cookie, so they read their own writes.
+    """
+
+    def __init__(self):
+        self.bind_keys = []
+        self.max_lag = 5.0
+        self.check_interval = 5.0
+        self.pin_seconds = 10.0
+        self._health = {}
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read the replica binds and lag limits from the app configuration."""
+        self.bind_keys = sorted(
+            key for key in app.config.get("SQLALCHEMY_BINDS", {}) if key.startswith("replica_"))
+        self.max_lag = app.config.get("DB_REPLICA_MAX_LAG", self.max_lag)
+        self.check_interval = app.config.get("DB_REPLICA_CHECK_INTERVAL", self.check_interval)
+        self.pin_seconds = app.config.get("DB_PRIMARY_PIN_SECONDS", self.pin_seconds)
+        self._health = {}
+        self._cycle = itertools.cycle(self.bind_keys) if self.bind_keys else None
+        app.extensions["replica_router"] = self
+        if self.bind_keys:
+            app.after_request(self.pin_after_write)
+
+    def pin_after_write(self, response):
+        """Pin a client that just wrote to the primary until replicas have caught up."""
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            until = time.time() + self.pin_seconds
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, f"{until:.3f}", max_age=math.ceil(self.pin_seconds),
+                httponly=True, samesite="Lax")
+        return response
+
+    def _is_healthy(self, key, engine):
+        now = time.monotonic()
+        healthy, checked_at = self._health.get(key, (False, None))
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return healthy
+
+        # Other threads keep using the previous result while one checks
+        self._health[key] = (healthy, now)
+        try:
+            with engine.connect() as connection:
+                lag = float(connection.execute(REPLICA_LAG_SQL).scalar())
+            healthy = lag <= self.max_lag
+            if not healthy:
+                logger.warning(f"Replica {key} is {lag:.1f}s behind, reading from the primary")
+        except Exception as e:
+            logger.warning(f"Replica {key} is unavailable: {e}")
+            healthy = False
+        self._health[key] = (healthy, time.monotonic())
+        return healthy
+
+    def choose(self, engines):
+        """Return a healthy replica engine, or None to use the primary."""
+        if self._cycle is None:
+            return None
+        for _ in range(len(self.bind_keys)):
+            with self._lock:
+                key = next(self._cycle)
+            engine = engines.get(key)
+            if engine is not None and self._is_healthy(key, engine):
+                return engine
+        return None
+
+class RoutingSession(Session):
+    """
+    Session sending SELECTs of read-only requests to a replica.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary.
+    The replica is chosen once per request so its reads see one snapshot
+    of replication progress.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+            and has_request_context()
+            and g.get("db_read_only")
+        ):
+            if "db_replica" not in g:
+                router = current_app.extensions.get("replica_router")
+                g.db_replica = router.choose(self._db.engines) if router else None
+            if g.db_replica is not None:
+                return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
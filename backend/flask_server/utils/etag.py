@@ -0,0 +1,18 @@
+import hashlib
+
+from flask import request
+
+def make_etag(*parts):
+    """Build an ETag value from cheap change markers and the request's query string."""
+    raw = "|".join(str(part) for part in parts) + "|" + request.query_string.decode("utf-8")
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def is_not_modified(etag):
+    """Return True if the client's If-None-Match already holds `etag`."""
+    return request.if_none_match.contains_weak(etag)
+
+def with_etag(response, etag):
+    """Attach a weak ETag and ask clients to revalidate before reusing the response."""
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
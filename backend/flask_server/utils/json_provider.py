@@ -0,0 +1,44 @@
+import uuid
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(obj):
+    """Serialize the types our models return that JSON has no native form for."""
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, emitting UUIDs as strings and datetimes as ISO 8601."""
+
+    default = staticmethod(_default)
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, which serializes UUID and datetime natively."""
+
+    option = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self.option)
+        return self._app.response_class(body, mimetype="application/json")
+
+def get_json_provider_class(name="auto"):
+    """Pick the provider for JSON_PROVIDER; "auto" prefers orjson when it is installed."""
+    if name in ("auto", "orjson") and orjson is not None:
+        return OrjsonProvider
+    return StdlibJSONProvider
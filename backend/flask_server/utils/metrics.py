@@ -0,0 +1,81 @@
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from shared.metrics import MetricsRegistry
+
+# Latency buckets in seconds, from sub-millisecond to ten seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class RequestMetrics:
+    """
+    Request latency and database time histograms served at /metrics.
+
+    Metrics are kept per process; with several server processes each one
+    reports its own series.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.request_latency = self.registry.histogram(
+            "http_request_duration_seconds", "Flask request latency", LATENCY_BUCKETS,
+            labelnames=("method", "endpoint", "status"))
+        self.request_db_time = self.registry.histogram(
+            "http_request_db_seconds", "Database time spent per Flask request", LATENCY_BUCKETS,
+            labelnames=("method", "endpoint"))
+        self.query_latency = self.registry.histogram(
+            "db_query_duration_seconds", "Duration of individual SQL statements", LATENCY_BUCKETS)
+
+    def init_app(self, app):
+        """Time every request and SQL statement, and register the /metrics route."""
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view)
+
+        if not event.contains(Engine, "before_cursor_execute", self._before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _start_request(self):
+        g.request_started_at = time.perf_counter()
+        g.request_db_time = 0.0
+
+    def _record_status(self, response):
+        g.response_status = response.status_code
+        return response
+
+    def _finish_request(self, exc):
+        # Runs even when a view raised, in which case no response was recorded
+        started_at = g.pop("request_started_at", None)
+        if started_at is None:
+            return
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        status = g.get("response_status", 500)
+        self.request_latency.observe(
+            time.perf_counter() - started_at, (request.method, endpoint, status))
+        self.request_db_time.observe(g.request_db_time, (request.method, endpoint))
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's execution context, so a statement that
+        # fails leaves nothing behind on the pooled connection
+        if context is not None:
+            context.query_started_at = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started_at = getattr(context, "query_started_at", None)
+        if started_at is None:
+            return
+        elapsed = time.perf_counter() - started_at
+        self.query_latency.observe(elapsed)
+        if has_request_context() and "request_db_time" in g:
+            g.request_db_time += elapsed
+
+    def render(self):
+        """Render all metrics in the Prometheus text format."""
+        return self.registry.render()
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,54 @@
+import base64
+import uuid
+from datetime import datetime
+
+def encode_cursor(timestamp, row_id):
+    """Encode the sort key of the last returned row as an opaque cursor."""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Returns:
+        tuple: (datetime, UUID) sort key of the last row already returned.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        timestamp, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def encode_score_cursor(score, row_id):
+    """Encode the (score, id) sort key of the last returned row of a ranked result."""
+    raw = f"{score!r}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_score_cursor(cursor):
+    """
+    Decode a cursor produced by encode_score_cursor.
+
+    Returns:
+        tuple: (float, UUID) sort key of the last row already returned.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        score, row_id = raw.split("|", 1)
+        return float(score), uuid.UUID(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def parse_limit(value, default, maximum):
+    """Parse a page size query parameter, clamped to [1, maximum]."""
+    if value is None:
+        return default
+    limit = int(value)
+    return max(1, min(limit, maximum))
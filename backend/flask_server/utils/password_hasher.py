@@ -0,0 +1,90 @@
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue is full or too slow and the request should be retried later."""
+
+class PasswordHasher:
+    """
+    Runs password key derivation in a dedicated process pool.
+
+    At most `workers + queue_size` hashes are in flight; beyond that
+    requests are rejected immediately instead of tying up WSGI workers.
+    A hash keeps its slot until it finishes, even after its request gave
+    up waiting for it.
+    """
+
+    def __init__(self):
+        self.method = "scrypt:32768:8:1"
+        self.salt_length = 16
+        self.workers = 2
+        self.queue_size = 32
+        self.timeout = 10
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read the hashing parameters and pool limits from the app configuration."""
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self.salt_length = app.config.get("PASSWORD_HASH_SALT_LENGTH", self.salt_length)
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", self.workers)
+        self.queue_size = app.config.get("PASSWORD_HASH_QUEUE_SIZE", self.queue_size)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout)
+
+    def _get_executor(self):
+        # Created lazily so each forked WSGI worker gets its own pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    atexit.register(self.shutdown)
+        return self._executor
+
+    def _run(self, fn, *args, **kwargs):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingBusyError("Password hashing queue is full")
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Drops the job if it has not started; a running one keeps its slot
+            future.cancel()
+            raise HashingBusyError("Password hashing timed out")
+
+    def hash(self, password):
+        """Hash a password with the configured parameters."""
+        return self._run(
+            generate_password_hash,
+            password,
+            method=self.method,
+            salt_length=self.salt_length
+        )
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash."""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Return True if the hash was made with parameters other than the configured ones."""
+        method, _, rest = password_hash.partition("$")
+        salt = rest.split("$", 1)[0]
+        return method != self.method or len(salt) != self.salt_length
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,9 @@
+from shared.token_cache import TokenCache as _TokenCache
+
+class TokenCache(_TokenCache):
+    """Flask extension around the token cache shared with the Tornado server."""
+
+    def init_app(self, app):
+        """Read the cache limits from the app configuration."""
+        self.maxsize = app.config.get("JWT_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("JWT_CACHE_TTL", self.ttl)
@@ -0,0 +1,67 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+class TokenCache:
+    """
+    Thread-safe LRU cache of verified JWT claims keyed by a SHA-256 digest of the token.
+
+    Entries expire at the token's `exp` claim, or after `ttl` seconds if
+    that comes first, so a cached token is never accepted past its expiry.
+    An optional revocation check runs on every hit. Used by both the Flask
+    API and the Tornado server.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.revocation_check = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def is_revoked(self, claims):
+        """Return True if the registered revocation check rejects `claims`."""
+        return bool(self.revocation_check and self.revocation_check(claims))
+
+    def get(self, token, now=None):
+        """Return the cached claims for `token`, or None on a miss."""
+        key = self._key(token)
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+        if self.is_revoked(claims):
+            self.invalidate(token)
+            return None
+        return claims
+
+    def put(self, token, claims, now=None):
+        """Cache the claims of a token that has just been fully verified."""
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl
+        if claims.get("exp"):
+            expires_at = min(expires_at, claims["exp"])
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        """Drop a token, e.g. after it has been revoked."""
+        with self._lock:
+            self._entries.pop(self._key(token), None)
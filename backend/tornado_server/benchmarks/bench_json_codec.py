@@ -0,0 +1,65 @@
+"""
+Microbenchmark of the JSON codec backends on typical WebSocket frames.
+
+Usage (from backend/tornado_server):
+    python -m benchmarks.bench_json_codec [--iterations N]
+"""
+import argparse
+import json
+import time
+
+from tornado.escape import json_encode, json_decode
+
+from utils import json_codec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_FRAME = {
+    "type": "assistant_response_chunk",
+    "message_id": "0b7e6a8c-8f8a-4a7e-9d43-2f1c8f0f6a51",
+    "index": 42,
+    "chunk": "The quick brown fox jumps over the lazy dog. " * 4,
+}
+
+CONVERSATION_FRAME = {
+    "type": "conversation_selected",
+    "conversation": {
+        "id": "0b7e6a8c-8f8a-4a7e-9d43-2f1c8f0f6a51",
+        "user_id": "6d1c2b1e-31a4-4d0e-bb4f-5c8f3f0f2a11",
+        "title": "Conversation 2025-01-01 12:00:00",
+        "created_at": "2025-01-01T12:00:00.123456",
+        "updated_at": "2025-01-01T12:30:00.654321",
+    },
+}
+
+PROMPT_MESSAGE = json.dumps({"type": "prompt", "prompt": "Explain keyset pagination " * 10})
+
+def bench(name, fn, arg, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(arg)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {elapsed * 1e9 / iterations:8.0f} ns/op")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    backends = [("tornado.escape", json_encode, json_decode), ("json", json_codec._stdlib_dumps, json.loads)]
+    if orjson is not None:
+        backends.append(("orjson", json_codec._orjson_dumps, orjson.loads))
+    else:
+        print("orjson is not installed; only stdlib backends are compared")
+
+    print(f"Selected backend: {json_codec.BACKEND}")
+    for name, dumps, loads in backends:
+        bench(f"{name} dumps chunk frame", dumps, CHUNK_FRAME, args.iterations)
+        bench(f"{name} dumps conversation frame", dumps, CONVERSATION_FRAME, args.iterations)
+        bench(f"{name} loads prompt message", loads, PROMPT_MESSAGE, args.iterations)
+
+if __name__ == "__main__":
+    main()
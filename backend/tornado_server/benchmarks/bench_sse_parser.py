@@ -0,0 +1,100 @@
+"""
+Microbenchmark of per-token LLM stream parsing cost.
+
+Compares the incremental SSEParser (with the selected JSON codec)
+against the previous line-by-line decode/strip/json.loads approach.
+
+Usage (from backend/tornado_server):
+    python -m benchmarks.bench_sse_parser [--tokens N] [--chunk-size BYTES]
+"""
+import argparse
+import json
+import random
+import time
+
+from utils.sse_parser import SSEParser, extract_token
+from utils import json_codec
+
+def make_stream(num_tokens, style):
+    """Build an event-stream body with one event per token."""
+    events = []
+    for i in range(num_tokens):
+        word = f"tok{i % 97} "
+        if style == "chat":
+            payload = {"id": "cmpl-1", "object": "chat.completion.chunk",
+                       "choices": [{"index": 0, "delta": {"content": word}}]}
+        else:
+            payload = {"id": "cmpl-1", "object": "text_completion",
+                       "choices": [{"index": 0, "text": word}]}
+        events.append(f"data: {json.dumps(payload)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode("utf-8")
+
+def split_chunks(body, chunk_size):
+    """Split the body into network-like chunks of roughly `chunk_size` bytes."""
+    rng = random.Random(42)
+    chunks = []
+    pos = 0
+    while pos < len(body):
+        size = rng.randint(max(1, chunk_size // 2), chunk_size * 2)
+        chunks.append(body[pos:pos + size])
+        pos += size
+    return chunks
+
+def parse_incremental(chunks):
+    parser = SSEParser()
+    tokens = 0
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            if event.data == b"[DONE]":
+                return tokens
+            if extract_token(json_codec.loads(event.data)):
+                tokens += 1
+    return tokens
+
+def split_lines(chunks):
+    """Mimic aiohttp's line iterator over the same chunks."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+
+def parse_line_based(chunks):
+    tokens = 0
+    for line in split_lines(chunks):
+        line = line.decode("utf-8").strip()
+        if line.startswith("data: "):
+            data = line[6:]
+            if data.startswith("[DONE]"):
+                return tokens
+            if json.loads(data).get("choices", [{}])[0].get("text", ""):
+                tokens += 1
+    return tokens
+
+def bench(name, fn, chunks, num_tokens, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {best * 1e9 / num_tokens:8.0f} ns/token  {num_tokens / best:12,.0f} tokens/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"JSON codec: {json_codec.BACKEND}")
+    completion = split_chunks(make_stream(args.tokens, "completion"), args.chunk_size)
+    chat = split_chunks(make_stream(args.tokens, "chat"), args.chunk_size)
+
+    bench("line-based (completion)", parse_line_based, completion, args.tokens, args.repeat)
+    bench("SSEParser (completion)", parse_incremental, completion, args.tokens, args.repeat)
+    bench("SSEParser (chat delta)", parse_incremental, chat, args.tokens, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,23 @@
 from tornado.web import RequestHandler
-import json
+
+from utils import json_codec
 
 class HealthHandler(RequestHandler):
 
+    def initialize(self, persistence_queue, registry):
+        """Initialize the handler."""
+        self.persistence_queue = persistence_queue
+        self.registry = registry
+
     def get(self):
         """Return a health status."""
         self.set_header("Content-Type", "application/json")
-        self.write(json.dumps({
+        self.write(json_codec.dumps({
             "status": "healthy",
-            "service": "tornado_ws"
+            "service": "tornado_ws",
+            "worker_id": self.registry.worker_id,
+            "persistence_queue_depth": self.persistence_queue.depth,
+            "connections": self.registry.connections,
+            "global_connections": self.registry.global_connections(),
+            "global_users": self.registry.global_users()
         }))
\ No newline at end of file
@@ -0,0 +1,10 @@
+from tornado.web import RequestHandler
+
+from utils import metrics
+
+class MetricsHandler(RequestHandler):
+
+    def get(self):
+        """Return this worker's metrics in the Prometheus text format."""
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(metrics.REGISTRY.render())
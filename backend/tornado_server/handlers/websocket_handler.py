@@ -1,31 +1,65 @@
-import json
 import logging
 import asyncio
 import uuid
+import time
 from datetime import datetime
-from tornado.websocket import WebSocketHandler
-from tornado.escape import json_decode, json_encode
+from tornado.ioloop import IOLoop
+from tornado.websocket import WebSocketHandler, WebSocketClosedError
 
 from services.llm_service import LLMService
 from services.auth_service import validate_jwt_token
-from services.message_service import MessageService
+from services.context_service import ContextBuilder
+from utils.chunk_coalescer import ChunkCoalescer
 from utils.logging_utils import setup_request_logger
+from utils import ws_protocol
+from utils import metrics
+from config import get_config
 
 logger = logging.getLogger(__name__)
+config = get_config()
 
 class ChatWebSocketHandler(WebSocketHandler):
     """WebSocket handler for chat interactions."""
 
     connections = set()
 
-    def initialize(self):
+    def initialize(self, http_client, message_service, persistence_queue, history_cache,
+                   registry, replay_buffer, admission, response_cache, summarizer,
+                   resume_enabled=True):
         """Initialize the handler."""
         self.user_id = None
         self.conversation_id = None
-        self.llm_service = LLMService()
-        self.message_service = MessageService()
+        self.llm_service = LLMService(http_client, admission, response_cache)
+        self.message_service = message_service
+        self.persistence_queue = persistence_queue
+        self.summarizer = summarizer
+        self.registry = registry
+        self.replay_buffer = replay_buffer
+        self.resume_enabled = resume_enabled
+        self.stream_subscriptions = set()
+        self.prompt_task = None
+        self.current_message_id = None
+        self.frame_codec = ws_protocol.JSONFrameCodec()
+        self.context_builder = ContextBuilder(
+            history_cache, self.message_service, config.CONTEXT_TOKEN_BUDGET,
+            config.SUMMARY_KEEP_RECENT)
         self.request_logger = setup_request_logger()
 
+    def select_subprotocol(self, subprotocols):
+        """Negotiate the frame encoding; clients offering no subprotocol get JSON."""
+        subprotocol = ws_protocol.select_subprotocol(subprotocols)
+        self.frame_codec = ws_protocol.make_frame_codec(subprotocol)
+        return subprotocol
+
+    def get_compression_options(self):
+        """Enable permessage-deflate when configured."""
+        if not config.WS_COMPRESSION_ENABLED:
+            return None
+        return {
+            "compression_level": config.WS_COMPRESSION_LEVEL,
+            "mem_level": config.WS_COMPRESSION_MEM_LEVEL,
+        }
+
     def check_origin(self, origin):
         """Allow connections from any origin."""
         # In production, you should restrict this to your allowed origins
@@ -35,11 +69,13 @@ class ChatWebSocketHandler(WebSocketHandler):
         """Handler new WebSocket connections."""
         self.request_logger.info("New WebSocket connection opened")
         ChatWebSocketHandler.connections.add(self)
+        self.registry.connection_opened()
+        metrics.WEBSOCKET_CONNECTIONS.inc()
 
     async def on_message(self, message):
         """Handle incoming messages from clients."""
         try:
-            message_data = json_decode(message)
+            message_data = self.frame_codec.decode(message)
 
             # Process message based on type
             msg_type = message_data.get("type", "")
@@ -47,16 +83,22 @@ class ChatWebSocketHandler(WebSocketHandler):
             if msg_type == "auth":
                 await self.handle_auth(message_data)
             elif msg_type == "prompt":
-                await self.handle_prompt(message_data)
+                await self.start_prompt(message_data)
+            elif msg_type == "cancel":
+                await self.handle_cancel(message_data)
+            elif msg_type == "ping":
+                await self.send_frame({"type": "pong"})
             elif msg_type == "create_conversation":
                 await self.handle_create_conversation(message_data)
             elif msg_type == "select_conversation":
                 await self.handle_select_conversation(message_data)
+            elif msg_type == "resume":
+                await self.handle_resume(message_data)
             else:
                 await self.send_error("Unknown message type")
         
-        except json.JSONDecodeError:
-            await self.send_error("Invalid JSON message")
+        except ws_protocol.FrameDecodeError as e:
+            await self.send_error(str(e))
         except Exception as e:
             self.request_logger.exception("Error processing message: {e}")
             await self.send_error(f"Internal server error: {str(e)}")
@@ -74,15 +116,18 @@ class ChatWebSocketHandler(WebSocketHandler):
             await self.send_error("Invalid authentication token")
             return
 
+        if self.user_id:
+            self.registry.user_disconnected(self.user_id)
         self.user_id = user_id
+        self.registry.user_connected(user_id)
         self.request_logger.info(f"User {user_id} authenticated via WebSocket")
 
-        await self.write_message(json_encode({
+        await self.send_frame({
             "type": "auth_success",
             "user_id": user_id
-        }))
+        })
 
-    async def hanlde_create_conversation(self, data):
+    async def handle_create_conversation(self, data):
         """Handle creation of a new conversation."""
         if not self.user_id:
             await self.send_error("Authentication required")
@@ -98,10 +143,11 @@ class ChatWebSocketHandler(WebSocketHandler):
             return
         
         self.conversation_id = conversation.get('id')
-        await self.write_message(json_encode({
+        self.context_builder.start(self.conversation_id)
+        await self.send_frame({
             "type": "conversation_created",
             "conversation": conversation
-        }))
+        })
 
     async def handle_select_conversation(self, data):
         """Handle selection of an existing conversation."""
@@ -122,11 +168,80 @@ class ChatWebSocketHandler(WebSocketHandler):
             return
         
         self.conversation_id = conversation_id
+        await self.context_builder.warm(self.user_id, conversation_id)
 
-        await self.write_message(json_encode({
+        await self.send_frame({
             "type": "conversation_selected",
             "conversation": conversation
-        }))
+        })
+
+    async def start_prompt(self, data):
+        """Run the prompt as a task so the socket keeps processing messages while it streams."""
+        if self.prompt_task and not self.prompt_task.done():
+            await self.send_error("A response is already being generated")
+            return
+        self.prompt_task = asyncio.ensure_future(self.run_prompt(data))
+
+    async def run_prompt(self, data):
+        """Task wrapper around handle_prompt reporting unexpected errors."""
+        try:
+            await self.handle_prompt(data)
+        except Exception as e:
+            self.request_logger.exception(f"Error processing prompt: {e}")
+            try:
+                await self.send_error(f"Internal server error: {str(e)}")
+            except WebSocketClosedError:
+                pass
+
+    async def handle_cancel(self, data):
+        """
+        Handle a request to stop a response being generated.
+
+        Besides this socket's own response, a client can stop one it resumed
+        after reconnecting, which is still generated by its old socket's task.
+        """
+        message_id = data.get("message_id")
+        own_task = self.prompt_task if self.prompt_task and not self.prompt_task.done() else None
+
+        if message_id and message_id != self.current_message_id:
+            if not self.replay_buffer.cancel(message_id, self.user_id):
+                await self.send_error("Response not found")
+            return
+
+        if own_task:
+            own_task.cancel()
+            return
+
+        if message_id:
+            await self.send_error("No response is being generated")
+            return
+
+        # Without an id, stop the responses this socket resumed
+        resumed = [
+            stream_id for stream_id in self.stream_subscriptions
+            if self.replay_buffer.cancel(stream_id, self.user_id)
+        ]
+        if not resumed:
+            await self.send_error("No response is being generated")
+
+    def cancel_generation(self):
+        """Cancel the running prompt task, returning it so the caller can await it."""
+        task = self.prompt_task
+        if task and not task.done():
+            task.cancel()
+            return task
+        return None
+
+    def cancel_if_abandoned(self, task, message_id):
+        """Cancel a generation nobody is following any more, re-checking while it is resumed."""
+        if task.done():
+            return
+        if self.replay_buffer.has_subscribers(message_id):
+            IOLoop.current().call_later(
+                config.STREAM_ABANDON_GRACE, self.cancel_if_abandoned, task, message_id)
+            return
+        self.request_logger.info(f"Cancelling abandoned response {message_id}")
+        task.cancel()
 
     async def handle_prompt(self, data):
         """Handle user prompt and stream LLM response."""
@@ -134,68 +249,203 @@ class ChatWebSocketHandler(WebSocketHandler):
             await self.send_error("Authentication required")
             return
         
-        if not self.conversation_id:
-            # Auto-create a conversation if needed
-            await self.hanlde_create_conversation({})
-        
         prompt = data.get('prompt')
         if not prompt:
             await self.send_error("No prompt provided")
             return
+
+        if not self.conversation_id:
+            # Auto-create a conversation if needed
+            await self.handle_create_conversation({})
+            if not self.conversation_id:
+                # The client has already been sent the error
+                return
+
+        # Time to first token is measured from here, so it includes context
+        # assembly and any admission queueing
+        started_at = time.perf_counter()
+        first_token_at = None
         
-        # Save user message
-        await self.message_service.save_message(self.conversation_id, 'user', prompt)
+        # The socket may switch conversations while this response streams
+        conversation_id = self.conversation_id
+
+        # Assemble the conversation context before recording the new turn
+        context = await self.context_builder.build(self.user_id, conversation_id, prompt)
 
-        # Prepare response message
+        # Queue the user message; persistence happens off the streaming path
+        await self.persistence_queue.enqueue(
+            conversation_id, 'user', prompt, user_id=self.user_id)
+        self.context_builder.record(conversation_id, 'user', prompt)
+
+        # Prepare response message; chunks go through the replay buffer so
+        # a reconnecting client can resume the stream
         response_message_id = str(uuid.uuid4())
-        await self.write_message(json_encode({
+        self.current_message_id = response_message_id
+        self.replay_buffer.start(
+            response_message_id, self.user_id, conversation_id, asyncio.current_task())
+        self.subscribe_stream(response_message_id)
+        await self.send_frame({
             "type": "assistant_response_start",
             "message_id": response_message_id
-        }))
+        })
+
+        # Collect the full response while coalescing tokens into frames
+        response_parts = []
+
+        async def send_chunk(chunk):
+            await self.replay_buffer.append(response_message_id, chunk)
+
+        coalescer = ChunkCoalescer(
+            send_chunk,
+            flush_interval=config.STREAM_FLUSH_INTERVAL_MS / 1000,
+            max_bytes=config.STREAM_FLUSH_MAX_BYTES,
+            flush_first=config.STREAM_LOW_LATENCY,
+        )
 
-        # Variable to collect the full response
-        full_response = ""
+        def send_queued(position):
+            self.send_stream_frame({
+                "type": "queued",
+                "message_id": response_message_id,
+                "position": position
+            })
 
-        # Stream the LLM response
+        # Stream the LLM response; it keeps going if this socket drops until
+        # it is cancelled. Cancelling closes the upstream request right away,
+        # unless other sockets are following it through the response cache.
+        cancelled = False
         try:
-            async for token in self.llm_service.stream_completion(prompt):
-                full_response += token
+            stream = self.llm_service.stream_completion(context, self.user_id, send_queued)
+            async for token in stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    metrics.TIME_TO_FIRST_TOKEN.observe(first_token_at - started_at)
+                response_parts.append(token)
+                await coalescer.add(token)
 
-                await self.write_message(json_encode({
-                    "type": "assistant_response_chunk",
-                    "message_id": response_message_id,
-                    "chunk": token
-                }))
+            await coalescer.flush()
 
-                # Small delay to prevent overwhelming the client
-                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled = True
+            await coalescer.flush()
+            self.request_logger.info(f"LLM response {response_message_id} cancelled")
         
         except Exception as e:
+            coalescer.cancel()
             self.request_logger.exception(f"Error streaming LLM response: {e}")
-            await self.send_error(f"Error generating response: {str(e)}")
+            metrics.RESPONSES.inc(labels=("error",))
+            await self.replay_buffer.finish(
+                response_message_id, error=f"Error generating response: {str(e)}")
+            self.unsubscribe_stream(response_message_id)
             return
         
         # Signal end of response
-        await self.write_message(json_encode({
-            "type": "assistant_response_end",
-            "message_id": response_message_id,
-        }))
+        await self.replay_buffer.finish(response_message_id, cancelled=cancelled)
+        self.record_stream_metrics(first_token_at, len(response_parts), cancelled)
+        self.unsubscribe_stream(response_message_id)
+
+        # Save the assistant's message, or what was generated before a cancel,
+        # using the response id as its idempotency key
+        full_response = "".join(response_parts)
+        if not full_response:
+            return
+        await self.persistence_queue.enqueue(
+            conversation_id, 'assistant', full_response,
+            message_id=response_message_id, user_id=self.user_id)
+        self.context_builder.record(conversation_id, 'assistant', full_response)
+        if self.summarizer:
+            self.summarizer.maybe_summarize(conversation_id, self.user_id)
+
+        self.request_logger.info(f"LLM response completed for conversation {conversation_id}")
 
-        # Save the assistant's message
-        await self.message_service.save_message(self.conversation_id, 'assistant', full_response)
+    def record_stream_metrics(self, first_token_at, token_count, cancelled):
+        """Record the outcome and token rate of a finished response."""
+        metrics.RESPONSES.inc(labels=("cancelled" if cancelled else "completed",))
+        if first_token_at is None or token_count < 2:
+            return
+        elapsed = time.perf_counter() - first_token_at
+        if elapsed > 0:
+            # The first token starts the clock, so it is not counted
+            metrics.TOKENS_PER_SECOND.observe((token_count - 1) / elapsed)
 
-        self.request_logger.info(f"LLM response completed for conversation {self.conversation_id}")
+    async def handle_resume(self, data):
+        """Handle a reconnected client resuming a response from a chunk offset."""
+        if not self.user_id:
+            await self.send_error("Authentication required")
+            return
+
+        if not self.resume_enabled:
+            await self.send_error("Resuming responses is not available on this server")
+            return
+
+        message_id = data.get("message_id")
+        try:
+            offset = int(data.get("offset", 0))
+        except (TypeError, ValueError):
+            offset = -1
+        if not message_id or offset < 0:
+            await self.send_error("Invalid resume request")
+            return
+
+        stream = self.replay_buffer.get(message_id, self.user_id)
+        if not stream:
+            await self.send_error("Response not found or expired")
+            return
+
+        self.conversation_id = stream["conversation_id"]
+        await self.send_frame({
+            "type": "assistant_response_resumed",
+            "message_id": message_id,
+            "offset": offset
+        })
+
+        self.stream_subscriptions.add(message_id)
+        await self.replay_buffer.replay(message_id, offset, self.send_stream_frame)
+
+    def send_frame(self, frame):
+        """Encode a frame with the negotiated framing and write it."""
+        return self.write_message(self.frame_codec.encode(frame), binary=self.frame_codec.binary)
+
+    def send_stream_frame(self, frame):
+        """Write a stream frame, returning the write future or None if the socket is closed."""
+        try:
+            return self.send_frame(frame)
+        except WebSocketClosedError:
+            return None
+
+    def subscribe_stream(self, message_id):
+        self.stream_subscriptions.add(message_id)
+        self.replay_buffer.subscribe(message_id, self.send_stream_frame)
+
+    def unsubscribe_stream(self, message_id):
+        self.stream_subscriptions.discard(message_id)
+        self.replay_buffer.unsubscribe(message_id, self.send_stream_frame)
 
     async def send_error(self, message):
         """Send an error message to the client."""
-        await self.write_message(json_encode({
+        await self.send_frame({
             "type": "error",
             "message": message
-        }))
+        })
 
     def on_close(self):
         """Handle WebSocket connection close."""
         ChatWebSocketHandler.connections.remove(self)
+        self.registry.connection_closed()
+        metrics.WEBSOCKET_CONNECTIONS.dec()
+        for message_id in list(self.stream_subscriptions):
+            self.unsubscribe_stream(message_id)
+        if self.user_id:
+            self.registry.user_disconnected(self.user_id)
+
+        # Give the client a grace period to resume before the generation is cancelled
+        task = self.prompt_task
+        if task and not task.done():
+            if self.resume_enabled and config.STREAM_ABANDON_GRACE > 0:
+                IOLoop.current().call_later(
+                    config.STREAM_ABANDON_GRACE, self.cancel_if_abandoned,
+                    task, self.current_message_id)
+            else:
+                task.cancel()
         self.request_logger.info("WebSocket connection closed")
 
     
\ No newline at end of file
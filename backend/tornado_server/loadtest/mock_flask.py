@@ -0,0 +1,103 @@
+"""
+Stub of the Flask API endpoints the Tornado server calls.
+
+Conversations and messages are kept in memory, and each call can be given
+a fixed latency to stand in for the database round trip.
+
+Usage (from backend/tornado_server):
+    python -m loadtest.mock_flask [--port 9101] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+class MockFlaskAPI:
+    """In-memory conversation and message store behind the Flask API routes."""
+
+    def __init__(self, latency=0.0):
+        """
+        Args:
+            latency (float): Seconds added to every request.
+        """
+        self.latency = latency
+        self.conversations = {}
+        self.messages_saved = 0
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post("/api/conversations/", self.create_conversation)
+        app.router.add_get("/api/conversations/{conversation_id}", self.get_conversation)
+        app.router.add_post("/api/messages/", self.create_message)
+        app.router.add_post("/api/messages/assistant", self.create_message)
+        app.router.add_post("/api/messages/batch", self.create_messages_batch)
+        return app
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_conversation(self, request):
+        await self._delay()
+        data = await request.json()
+        now = datetime.now(timezone.utc).isoformat()
+        conversation = {
+            "id": str(uuid.uuid4()),
+            "title": data.get("title", "Load test"),
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.conversations[conversation["id"]] = []
+        return web.json_response({"conversation": conversation}, status=201)
+
+    async def get_conversation(self, request):
+        await self._delay()
+        conversation_id = request.match_info["conversation_id"]
+        messages = self.conversations.get(conversation_id)
+        if messages is None:
+            return web.json_response({"error": "Conversation not found"}, status=404)
+        return web.json_response({
+            "conversation": {"id": conversation_id},
+            "messages": messages[-int(request.query.get("limit", 50)):][::-1],
+        })
+
+    async def create_message(self, request):
+        await self._delay()
+        data = await request.json()
+        data["role"] = "assistant" if request.path.endswith("/assistant") else "user"
+        self._store(data)
+        return web.json_response({"message": data}, status=201)
+
+    async def create_messages_batch(self, request):
+        await self._delay()
+        data = await request.json()
+        ids, rejected = [], []
+        for record in data.get("messages", []):
+            if record.get("conversation_id") in self.conversations:
+                ids.append(self._store(record))
+            else:
+                rejected.append(record.get("id"))
+        return web.json_response(
+            {"ids": ids, "inserted": len(ids), "rejected": rejected, "invalid": []}, status=201)
+
+    def _store(self, record):
+        message_id = record.get("id") or str(uuid.uuid4())
+        self.conversations.setdefault(record.get("conversation_id"), []).append({
+            "id": message_id,
+            "role": record.get("role", "user"),
+            "content": record.get("content", ""),
+        })
+        self.messages_saved += 1
+        return message_id
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--latency-ms", type=float, default=5, help="Added latency per request")
+    args = parser.parse_args()
+    web.run_app(MockFlaskAPI(args.latency_ms / 1000).make_app(), host="127.0.0.1", port=args.port)
+
+if __name__ == "__main__":
+    main()
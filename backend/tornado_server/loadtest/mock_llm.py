@@ -0,0 +1,97 @@
+"""
+Mock OpenAI-compatible completion server that streams tokens over SSE.
+
+Point the Tornado server at it with LLM_API_URL. Every token is a short
+word followed by a space, so clients can count tokens in coalesced chunks.
+
+Usage (from backend/tornado_server):
+    python -m loadtest.mock_llm [--port 9100] [--ttft-ms 200] [--tokens-per-sec 50]
+                                [--tokens 100] [--error-rate 0.0] [--stream-error-rate 0.0]
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+class MockLLMServer:
+    """Streams completion-style SSE events with configurable timing and failures."""
+
+    def __init__(self, ttft, tokens_per_sec, num_tokens, error_rate=0.0,
+                 stream_error_rate=0.0, seed=None):
+        """
+        Args:
+            ttft (float): Seconds before the first token is sent.
+            tokens_per_sec (float): Token rate after the first token.
+            num_tokens (int): Tokens per response, unless the request asks for fewer.
+            error_rate (float): Fraction of requests answered with HTTP 500.
+            stream_error_rate (float): Fraction of streams cut off halfway through.
+        """
+        self.ttft = ttft
+        self.token_interval = 1 / tokens_per_sec if tokens_per_sec > 0 else 0
+        self.num_tokens = num_tokens
+        self.error_rate = error_rate
+        self.stream_error_rate = stream_error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    def make_app(self):
+        app = web.Application()
+        # LLM_API_URL is used as the full endpoint, so accept any path
+        app.router.add_post("/{tail:.*}", self.handle_completion)
+        return app
+
+    async def handle_completion(self, request):
+        self.requests += 1
+        payload = await request.json()
+
+        if self.rng.random() < self.error_rate:
+            return web.json_response({"error": "injected failure"}, status=500)
+
+        num_tokens = min(self.num_tokens, payload.get("max_tokens") or self.num_tokens)
+        cut_at = num_tokens // 2 if self.rng.random() < self.stream_error_rate else None
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+        await asyncio.sleep(self.ttft)
+
+        for i in range(num_tokens):
+            if i == cut_at:
+                # Drop the connection without a [DONE] event
+                request.transport.close()
+                return response
+            if i:
+                await asyncio.sleep(self.token_interval)
+            event = {"object": "text_completion", "choices": [{"index": 0, "text": f"tok{i} "}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+def add_arguments(parser):
+    parser.add_argument("--ttft-ms", type=float, default=200, help="Delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50, help="Token rate per stream")
+    parser.add_argument("--tokens", type=int, default=100, help="Tokens per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0,
+                        help="Fraction of streams dropped halfway")
+
+def from_arguments(args):
+    return MockLLMServer(
+        args.ttft_ms / 1000, args.tokens_per_sec, args.tokens,
+        args.error_rate, args.stream_error_rate)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(from_arguments(args).make_app(), host="127.0.0.1", port=args.port)
+
+if __name__ == "__main__":
+    main()
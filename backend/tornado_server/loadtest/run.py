@@ -0,0 +1,103 @@
+"""
+End-to-end offline load test of the chat path.
+
+Starts the mock LLM server and the Flask API stub in this process, launches
+the Tornado server against them, runs the client swarm and prints latency,
+throughput and server CPU/RSS. Nothing leaves the machine.
+
+Usage (from backend/tornado_server):
+    python -m loadtest.run [--clients 50] [--prompts 3] [--workers 1]
+                           [--ttft-ms 200] [--tokens-per-sec 50] [--error-rate 0.0]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+from loadtest import mock_llm, swarm
+from loadtest.mock_flask import MockFlaskAPI
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def start_site(app, port):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+async def wait_until_healthy(url, timeout):
+    """Poll the server's /health endpoint until it answers."""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server did not become healthy within {timeout}s")
+
+async def run(args):
+    llm = mock_llm.from_arguments(args)
+    flask_api = MockFlaskAPI(args.flask_latency_ms / 1000)
+    runners = [
+        await start_site(llm.make_app(), args.llm_port),
+        await start_site(flask_api.make_app(), args.flask_port),
+    ]
+
+    env = dict(
+        os.environ,
+        PORT=str(args.port),
+        LLM_API_URL=f"http://127.0.0.1:{args.llm_port}/v1/completions",
+        LLM_API_KEY="loadtest",
+        LLM_MAX_TOKENS=str(args.tokens),
+        LLM_CACHE_ENABLED="false",
+        SUMMARY_ENABLED="false",
+        FLASK_API_URL=f"http://127.0.0.1:{args.flask_port}",
+        MESSAGE_STORE="http",
+        TORNADO_WORKERS=str(args.workers),
+    )
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, "main.py", "--logging=warning", cwd=SERVER_DIR, env=env)
+
+    try:
+        await wait_until_healthy(f"http://127.0.0.1:{args.port}/health", args.startup_timeout)
+        sampler = swarm.ResourceSampler(server.pid)
+        sampler_task = asyncio.ensure_future(sampler.run())
+        try:
+            stats = await swarm.run_swarm(
+                f"ws://127.0.0.1:{args.port}/ws/chat", args.clients, args.prompts,
+                args.users, args.ramp_up, args.think_time, env.get("JWT_SECRET_KEY"))
+        finally:
+            sampler_task.cancel()
+    finally:
+        if server.returncode is None:
+            server.send_signal(signal.SIGTERM)
+            await server.wait()
+        for runner in runners:
+            await runner.cleanup()
+
+    print(swarm.format_report(stats, sampler))
+    print(f"upstream requests: {llm.requests}  messages persisted: {flask_api.messages_saved}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8899, help="Port for the Tornado server")
+    parser.add_argument("--llm-port", type=int, default=9100)
+    parser.add_argument("--flask-port", type=int, default=9101)
+    parser.add_argument("--workers", type=int, default=1, help="TORNADO_WORKERS for the server")
+    parser.add_argument("--flask-latency-ms", type=float, default=5, help="Added latency per API call")
+    parser.add_argument("--startup-timeout", type=float, default=15)
+    mock_llm.add_arguments(parser)
+    swarm.add_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+WebSocket client swarm for the chat endpoint.
+
+Each client authenticates with a locally signed JWT, creates a conversation
+and sends prompts one after another, recording time to first token and
+per-token latency. Tokens are counted by the spaces in each chunk, which
+matches the output of loadtest.mock_llm.
+
+Usage (from backend/tornado_server):
+    python -m loadtest.swarm [--url ws://127.0.0.1:8888/ws/chat] [--clients 50]
+                             [--prompts 3] [--server-pid PID]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+import jwt
+
+from config import get_config
+
+config = get_config()
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`, or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def make_token(user_id, secret):
+    """Sign an access token the Tornado server will accept."""
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": user_id, "type": "access", "iat": now, "exp": now + timedelta(hours=1)},
+        secret, algorithm="HS256")
+
+class SwarmStats:
+    """Latency samples and counters collected by all clients."""
+
+    def __init__(self):
+        self.ttft = []
+        self.inter_token = []
+        self.tokens = 0
+        self.responses = 0
+        self.errors = 0
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def duration(self):
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+class ResourceSampler:
+    """
+    Samples CPU and RSS of a process and its children from /proc.
+
+    Children are included so a multi-worker server is measured as a whole.
+    Linux only; on other platforms no samples are taken.
+    """
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def _pids(self):
+        pids = [self.pid]
+        for pid in pids:
+            try:
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as f:
+                        pids.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+        return pids
+
+    def _read(self):
+        """Return total CPU seconds and RSS bytes across the process tree."""
+        cpu_ticks = 0
+        rss_pages = 0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    # Fields after the command name, which may contain spaces
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    rss_pages += int(f.read().split()[1])
+            except OSError:
+                continue
+            cpu_ticks += int(fields[11]) + int(fields[12])
+        return cpu_ticks / self._clock_ticks, rss_pages * self._page_size
+
+    async def run(self):
+        if not os.path.exists(f"/proc/{self.pid}"):
+            return
+        last_cpu, _ = self._read()
+        last_time = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            cpu, rss = self._read()
+            now = time.perf_counter()
+            self.cpu.append(100 * (cpu - last_cpu) / (now - last_time))
+            self.rss.append(rss)
+            last_cpu, last_time = cpu, now
+
+async def receive_until(ws, expected):
+    """Return the next frame of type `expected`, raising on error frames."""
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            break
+        frame = json.loads(msg.data)
+        if frame.get("type") == expected:
+            return frame
+        if frame.get("type") == "error":
+            raise RuntimeError(frame.get("message"))
+    raise RuntimeError(f"Connection closed while waiting for {expected}")
+
+async def stream_response(ws, stats):
+    """Read one response, recording its time to first token and token gaps."""
+    sent_at = time.perf_counter()
+    last_at = None
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            break
+        frame = json.loads(msg.data)
+        kind = frame.get("type")
+        if kind == "assistant_response_chunk":
+            now = time.perf_counter()
+            tokens = max(1, frame["chunk"].count(" "))
+            if last_at is None:
+                stats.ttft.append(now - sent_at)
+            else:
+                # Coalesced chunks carry several tokens; spread the gap over them
+                stats.inter_token.extend([(now - last_at) / tokens] * tokens)
+            stats.tokens += tokens
+            last_at = now
+        elif kind == "assistant_response_end":
+            stats.responses += 1
+            return
+        elif kind == "error":
+            raise RuntimeError(frame.get("message"))
+    raise RuntimeError("Connection closed during response")
+
+async def run_client(session, url, token, num_prompts, stats, think_time):
+    """Run the auth, create_conversation and prompt flow on one socket."""
+    try:
+        async with session.ws_connect(url) as ws:
+            await ws.send_str(json.dumps({"type": "auth", "token": token}))
+            await receive_until(ws, "auth_success")
+            await ws.send_str(json.dumps({"type": "create_conversation", "title": "Load test"}))
+            await receive_until(ws, "conversation_created")
+
+            for i in range(num_prompts):
+                await ws.send_str(json.dumps({"type": "prompt", "prompt": f"Load test prompt {i}"}))
+                try:
+                    await stream_response(ws, stats)
+                except RuntimeError:
+                    stats.errors += 1
+                    if ws.closed:
+                        return
+                if think_time:
+                    await asyncio.sleep(think_time)
+    except (aiohttp.ClientError, RuntimeError, asyncio.TimeoutError):
+        stats.errors += 1
+
+async def run_swarm(url, num_clients, num_prompts, num_users=None, ramp_up=0.0,
+                    think_time=0.0, secret=None):
+    """
+    Run `num_clients` concurrent clients and return their SwarmStats.
+
+    Args:
+        url (str): WebSocket URL of the chat endpoint.
+        num_clients (int): Concurrent sockets.
+        num_prompts (int): Prompts sent by each client.
+        num_users (int): Distinct user ids shared by the clients; defaults to one per client.
+        ramp_up (float): Seconds over which client start times are spread.
+        think_time (float): Pause between a response and the next prompt.
+        secret (str): JWT signing key; defaults to the server's JWT_SECRET_KEY.
+    """
+    secret = secret or config.JWT_SECRET_KEY
+    num_users = num_users or num_clients
+    tokens = [make_token(f"loadtest-user-{i}", secret) for i in range(num_users)]
+    stats = SwarmStats()
+
+    async def start_client(session, index):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / num_clients)
+        await run_client(session, url, tokens[index % num_users], num_prompts, stats, think_time)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        stats.started_at = time.perf_counter()
+        await asyncio.gather(*(start_client(session, i) for i in range(num_clients)))
+        stats.finished_at = time.perf_counter()
+    return stats
+
+def format_report(stats, sampler=None):
+    """Render the swarm results as a plain-text report."""
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.1f}ms"
+
+    lines = [
+        f"responses: {stats.responses}  errors: {stats.errors}  duration: {stats.duration:.2f}s",
+        f"throughput: {stats.tokens / stats.duration:.1f} tokens/s, "
+        f"{stats.responses / stats.duration:.2f} responses/s",
+    ]
+    for name, values in (("ttft", stats.ttft), ("inter-token", stats.inter_token)):
+        lines.append(
+            f"{name}: p50 {ms(percentile(values, 50))}  p95 {ms(percentile(values, 95))}  "
+            f"p99 {ms(percentile(values, 99))}")
+    if sampler and sampler.cpu:
+        lines.append(
+            f"server cpu: avg {sum(sampler.cpu) / len(sampler.cpu):.1f}%  "
+            f"max {max(sampler.cpu):.1f}%")
+        lines.append(
+            f"server rss: avg {sum(sampler.rss) / len(sampler.rss) / 2**20:.1f}MiB  "
+            f"max {max(sampler.rss) / 2**20:.1f}MiB")
+    return "\n".join(lines)
+
+def add_arguments(parser):
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent WebSocket clients")
+    parser.add_argument("--prompts", type=int, default=3, help="Prompts per client")
+    parser.add_argument("--users", type=int, default=None, help="Distinct users (default: one per client)")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="Seconds to start all clients")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pause between prompts")
+
+async def run(args):
+    sampler = ResourceSampler(args.server_pid) if args.server_pid else None
+    sampler_task = asyncio.ensure_future(sampler.run()) if sampler else None
+    try:
+        stats = await run_swarm(
+            args.url, args.clients, args.prompts, args.users, args.ramp_up, args.think_time)
+    finally:
+        if sampler_task:
+            sampler_task.cancel()
+    print(format_report(stats, sampler))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="ws://127.0.0.1:8888/ws/chat")
+    parser.add_argument("--server-pid", type=int, default=None, help="Sample this process's CPU and RSS")
+    add_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
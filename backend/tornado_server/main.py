@@ -1,28 +1,129 @@
 import os
+import sys
 import asyncio
 import signal
 import logging
+import tempfile
 from tornado.web import Application
 from tornado.ioloop import IOLoop
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
 import tornado.options
 
+# Code shared with the Flask API lives in backend/shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 from handlers.websocket_handler import ChatWebSocketHandler
 from handlers.health_handler import HealthHandler
+from handlers.metrics_handler import MetricsHandler
+from services.http_client import HTTPClientManager
+from services.message_service import MessageService
+from services.db_store import DatabaseMessageStore
+from services.persistence_queue import PersistenceQueue
+from services.context_service import ConversationHistoryCache
+from services.connection_registry import ConnectionRegistry
+from services.replay_buffer import StreamReplayBuffer
+from services.llm_cache import LLMResponseCache
+from services.admission import AdmissionController
+from services.llm_service import LLMService
+from services.summary_service import ConversationSummarizer
+from utils.process_utils import supervise_workers
+from utils import metrics
 from config import get_config
 
-def make_app(config):
+def register_metrics(persistence_queue, registry, admission, response_cache):
+    """Expose process-wide state as gauges and counters read at scrape time."""
+    metrics.REGISTRY.gauge(
+        "persistence_queue_depth", "Messages waiting to be written to the Flask API",
+        lambda: persistence_queue.depth)
+    metrics.REGISTRY.gauge(
+        "llm_admission_active", "Upstream LLM calls in progress", lambda: admission.active)
+    metrics.REGISTRY.gauge(
+        "llm_admission_queued", "Prompts waiting for an upstream LLM slot", lambda: admission.queued)
+    metrics.REGISTRY.gauge(
+        "chat_global_websocket_connections", "Open WebSocket connections across all workers",
+        registry.global_connections)
+    if response_cache is not None:
+        metrics.REGISTRY.counter(
+            "llm_cache_hits_total", "Prompts served from the LLM response cache",
+            callback=lambda: response_cache.hits)
+        metrics.REGISTRY.counter(
+            "llm_cache_misses_total", "Prompts that went to the upstream LLM API",
+            callback=lambda: response_cache.misses)
+
+def make_message_store(config, http_client):
+    """Create the conversation and message store selected by MESSAGE_STORE."""
+    if config.MESSAGE_STORE == "database":
+        return DatabaseMessageStore(config)
+    if config.MESSAGE_STORE != "http":
+        logging.warning(f"Unknown MESSAGE_STORE {config.MESSAGE_STORE}, using the Flask API")
+    return MessageService(http_client)
+
+def make_app(config, http_client, message_store, persistence_queue, registry,
+             resume_enabled=True, serve_metrics=True):
     """Create the Tornado application"""
-    return Application([
-        (r"/ws/chat", ChatWebSocketHandler),
-        (r"/health", HealthHandler),
-    ],
-    debug=config.DEBUG,
-    websocket_ping_interval=30)
-
-async def shutdown(signal, loop):
+    history_cache = ConversationHistoryCache(
+        config.CONTEXT_CACHE_CONVERSATIONS, config.CONTEXT_CACHE_MESSAGES,
+        config.CONTEXT_CACHE_FAILURE_TTL)
+    replay_buffer = StreamReplayBuffer(config.RESUME_MAX_STREAMS, config.RESUME_TTL)
+    admission = AdmissionController(
+        config.LLM_MAX_CONCURRENCY, config.LLM_MAX_QUEUE, config.LLM_QUEUE_TIMEOUT)
+    response_cache = None
+    if config.LLM_CACHE_ENABLED:
+        response_cache = LLMResponseCache(
+            config.LLM_CACHE_TTL, config.LLM_CACHE_MAX_ENTRIES, config.LLM_CACHE_MAX_BYTES,
+            config.LLM_CACHE_FOLLOW_TIMEOUT)
+    summarizer = None
+    if config.SUMMARY_ENABLED:
+        summarizer = ConversationSummarizer(
+            history_cache, LLMService(http_client, admission), persistence_queue,
+            config.SUMMARY_TRIGGER_TOKENS, config.SUMMARY_KEEP_RECENT, config.SUMMARY_MAX_TOKENS)
+    register_metrics(persistence_queue, registry, admission, response_cache)
+
+    handlers = [
+        (r"/ws/chat", ChatWebSocketHandler, dict(
+            http_client=http_client,
+            message_service=message_store,
+            persistence_queue=persistence_queue,
+            history_cache=history_cache,
+            registry=registry,
+            replay_buffer=replay_buffer,
+            admission=admission,
+            response_cache=response_cache,
+            summarizer=summarizer,
+            resume_enabled=resume_enabled)),
+        (r"/health", HealthHandler, dict(
+            persistence_queue=persistence_queue,
+            registry=registry)),
+    ]
+    if serve_metrics:
+        handlers.append((r"/metrics", MetricsHandler))
+
+    return Application(
+        handlers,
+        debug=config.DEBUG,
+        websocket_ping_interval=30)
+
+def start_metrics_server(port):
+    """Serve /metrics on a port of its own."""
+    server = HTTPServer(Application([(r"/metrics", MetricsHandler)]))
+    server.add_sockets(bind_sockets(port))
+    return server
+
+async def shutdown(signal, loop, http_client, message_store, persistence_queue, registry):
     """Graceful shutdown of the server"""
     logging.info(f"Received exit signal {signal.name}...")
 
+    # Stop generations first so their partial responses get queued
+    generations = [
+        task for task in (conn.cancel_generation() for conn in ChatWebSocketHandler.connections)
+        if task is not None
+    ]
+    await asyncio.gather(*generations, return_exceptions=True)
+
+    # Flush queued messages before their HTTP sessions go away
+    await persistence_queue.close()
+
     tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
     logging.info(f"Cancelling {len(tasks)} outstanding tasks")
 
@@ -30,10 +131,14 @@ async def shutdown(signal, loop):
         task.cancel()
 
     await asyncio.gather(*tasks, return_exceptions=True)
+
+    await message_store.close()
+    await http_client.close()
+    registry.stop()
     loop.stop()
     logging.info("Shutdown complete")
 
-def setup_shutdown_handlers():
+def setup_shutdown_handlers(http_client, message_store, persistence_queue, registry):
     """Set up signal handlers for graceful shutdown."""
     loop = asyncio.get_event_loop()
     signals = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT)
@@ -41,7 +146,8 @@ def setup_shutdown_handlers():
     for s in signals:
         loop.add_signal_handler(
             s,
-            lambda s=s: asyncio.create_task(shutdown(s, loop))
+            lambda s=s: asyncio.create_task(
+                shutdown(s, loop, http_client, message_store, persistence_queue, registry))
         )
 
 def main():
@@ -49,18 +155,63 @@ def main():
     tornado.options.parse_command_line()
 
     config = get_config()
-    app = make_app(config)
-
     port = int(os.environ.get("PORT", 8888))
-    app.listen(port)
 
-    logging.info(f"Tornado server started on port {port}")
+    # Shared by all workers, so it must exist before forking
+    registry_dir = config.REGISTRY_DIR or tempfile.mkdtemp(prefix="tornado-registry-")
+
+    num_workers = config.TORNADO_WORKERS or os.cpu_count()
+    worker_id = 0
+    if num_workers > 1:
+        worker_id = supervise_workers(num_workers, config.TORNADO_MAX_RESTARTS)
+        # Workers must not share a spill file
+        config.PERSIST_SPILL_PATH = f"{config.PERSIST_SPILL_PATH}.{worker_id}"
+
+    sticky = num_workers > 1 and config.TORNADO_STICKY_WORKERS
+    if sticky:
+        # Each worker gets its own port so the load balancer can send a
+        # client's reconnects back to the worker holding its streams
+        port += worker_id
+        sockets = bind_sockets(port)
+    else:
+        # With SO_REUSEPORT every worker binds its own socket and the kernel
+        # balances new connections between them
+        sockets = bind_sockets(port, reuse_port=num_workers > 1)
+
+    # Replay buffers and metrics are per worker, so resume only works if
+    # reconnects come back, and a scrape must reach the worker it targets
+    shared_port = num_workers > 1 and not sticky
+    resume_enabled = not shared_port
+    if shared_port and worker_id == 0:
+        logging.warning(
+            "Stream resume is disabled with several workers on one port; "
+            "set TORNADO_STICKY_WORKERS=true behind a sticky load balancer to enable it")
+
+    http_client = HTTPClientManager(config)
+    message_store = make_message_store(config, http_client)
+    persistence_queue = PersistenceQueue(message_store.save_messages, config)
+    registry = ConnectionRegistry(
+        registry_dir, worker_id, config.REGISTRY_PUBLISH_INTERVAL_MS)
+    metrics.REGISTRY.const_labels["worker"] = str(worker_id)
+    app = make_app(
+        config, http_client, message_store, persistence_queue, registry,
+        resume_enabled, serve_metrics=not shared_port)
+
+    server = HTTPServer(app)
+    server.add_sockets(sockets)
+    if shared_port:
+        start_metrics_server(config.METRICS_PORT + worker_id)
+        logging.info(f"Tornado worker {worker_id} serving metrics on port {config.METRICS_PORT + worker_id}")
+
+    logging.info(f"Tornado worker {worker_id} started on port {port}")
 
-    setup_shutdown_handlers()
+    setup_shutdown_handlers(http_client, message_store, persistence_queue, registry)
+    IOLoop.current().add_callback(persistence_queue.start)
+    IOLoop.current().add_callback(registry.start)
     IOLoop.current().start()
 
 if __name__ == "__main__":
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,124 @@
+import heapq
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed because the queue is full or its deadline passed."""
+
+class AdmissionController:
+    """
+    Global concurrency limit on upstream LLM calls with weighted fair queuing.
+
+    Waiting requests are ordered by virtual finish time per user, so one
+    user submitting many prompts cannot starve everyone else. Requests that
+    cannot be admitted before their deadline are shed instead of piling up.
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        """
+        Args:
+            max_concurrent (int): Upstream calls allowed at once.
+            max_queue (int): Requests allowed to wait; more are rejected at once.
+            queue_timeout (float): Seconds a request may wait before it is shed.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiting = []
+        self._last_tag = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    @property
+    def queued(self):
+        return len(self._waiting)
+
+    @asynccontextmanager
+    async def admit(self, user_id, weight=1.0, on_position=None):
+        """
+        Hold an upstream slot for the duration of the block.
+
+        Args:
+            user_id (str): Fair queuing is done across users.
+            weight (float): Relative share of this user's requests.
+            on_position (callable): Called with the 1-based queue position whenever it changes.
+
+        Raises:
+            AdmissionRejected: If the request is shed.
+        """
+        await self._acquire(user_id, weight, on_position)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, user_id, weight, on_position):
+        if self.active < self.max_concurrent and not self._waiting:
+            self.active += 1
+            return
+
+        if len(self._waiting) >= self.max_queue:
+            raise AdmissionRejected("Server is busy, please retry later")
+
+        tag = max(self._virtual_time, self._last_tag.get(user_id, 0.0)) + 1.0 / weight
+        self._last_tag[user_id] = tag
+        waiter = {
+            "future": asyncio.get_running_loop().create_future(),
+            "user_id": user_id,
+            "on_position": on_position,
+            "position": None,
+        }
+        entry = (tag, next(self._seq), waiter)
+        heapq.heappush(self._waiting, entry)
+        self._notify_positions()
+
+        try:
+            await asyncio.wait_for(waiter["future"], self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            future = waiter["future"]
+            if future.done() and not future.cancelled():
+                # Admitted just as we gave up; hand the slot on
+                self._release()
+            else:
+                try:
+                    self._waiting.remove(entry)
+                except ValueError:
+                    # Already popped and skipped by a release in the same tick
+                    pass
+                else:
+                    heapq.heapify(self._waiting)
+                    self._notify_positions()
+            if isinstance(e, asyncio.TimeoutError):
+                logger.warning(f"Shedding LLM request for user {user_id} after {self.queue_timeout}s in queue")
+                raise AdmissionRejected("Server is busy, please retry later") from e
+            raise
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.active < self.max_concurrent and self._waiting:
+            tag, _, waiter = heapq.heappop(self._waiting)
+            if self._last_tag.get(waiter["user_id"]) == tag:
+                # No later request of this user is queued
+                del self._last_tag[waiter["user_id"]]
+            if waiter["future"].done():
+                # Cancelled or timed out in this tick, before its cleanup ran
+                continue
+            self._virtual_time = tag
+            self.active += 1
+            waiter["future"].set_result(True)
+        self._notify_positions()
+
+    def _notify_positions(self):
+        for position, (_, _, waiter) in enumerate(sorted(self._waiting, key=lambda e: e[:2]), start=1):
+            if waiter["position"] != position:
+                waiter["position"] = position
+                if waiter["on_position"]:
+                    waiter["on_position"](position)
@@ -1,11 +1,61 @@
 import jwt
+import uuid
 import logging
+from collections import OrderedDict
 from datetime import datetime, timezone
 from config import get_config
+from shared.token_cache import TokenCache
 
 logger = logging.getLogger(__name__)
 config = get_config()
 
+token_cache = TokenCache(config.JWT_CACHE_SIZE, config.JWT_CACHE_TTL)
+
+def set_revocation_check(check):
+    """
+    Register a callable taking a token payload and returning True if it is revoked.
+
+    The check runs on every validation, including cache hits.
+    """
+    token_cache.revocation_check = check
+
+def revoke_token(token):
+    """Stop accepting a cached token immediately."""
+    token_cache.invalidate(token)
+
+# Access tokens signed for Flask API calls, by user id: (reuse until, token)
+_service_tokens = OrderedDict()
+
+def create_service_token(user_id):
+    """
+    Return an access token for calling the Flask API on behalf of `user_id`.
+
+    The token is signed with the key shared with the Flask API and lives for
+    SERVICE_TOKEN_TTL seconds. It is reused for half of that so a request
+    never goes out with a token about to expire.
+    """
+    now = int(datetime.now(timezone.utc).timestamp())
+    entry = _service_tokens.get(user_id)
+    if entry is not None and now < entry[0]:
+        _service_tokens.move_to_end(user_id)
+        return entry[1]
+
+    payload = {
+        "sub": str(user_id),
+        "type": "access",
+        "fresh": False,
+        "jti": str(uuid.uuid4()),
+        "iat": now,
+        "nbf": now,
+        "exp": now + config.SERVICE_TOKEN_TTL,
+    }
+    token = jwt.encode(payload, config.JWT_SECRET_KEY, algorithm="HS256")
+    _service_tokens[user_id] = (now + config.SERVICE_TOKEN_TTL // 2, token)
+    _service_tokens.move_to_end(user_id)
+    while len(_service_tokens) > config.JWT_CACHE_SIZE:
+        _service_tokens.popitem(last=False)
+    return token
+
 async def validate_jwt_token(token):
     """
     Validate JWT token and return user_id if valid.
@@ -16,6 +66,11 @@ async def validate_jwt_token(token):
     Returns:
         str: The user_id if the token is valid, None otherwise.
     """
+    now = datetime.now(timezone.utc).timestamp()
+    payload = token_cache.get(token, now)
+    if payload is not None:
+        return payload.get("sub")
+
     try:
         payload = jwt.decode(
             token, 
@@ -25,10 +80,16 @@ async def validate_jwt_token(token):
         
         # Check if token has expired
         exp = payload.get("exp")
-        if exp and datetime.now(timezone.utc).timestamp() > exp:
+        if exp and now > exp:
             logger.warning("Expired JWT token")
             return None
+
+        if token_cache.is_revoked(payload):
+            logger.warning("Revoked JWT token")
+            return None
         
+        token_cache.put(token, payload, now)
+
         # Return the user_id from the payload
         return payload.get("sub")
     
@@ -37,4 +98,4 @@ async def validate_jwt_token(token):
         return None
     except Exception as e:
         logger.error(f"Error validating JWT token: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import logging
+from collections import Counter
+
+from tornado.ioloop import PeriodicCallback
+
+logger = logging.getLogger(__name__)
+
+class ConnectionRegistry:
+    """
+    Connection registry shared by all worker processes on a host.
+
+    Each worker keeps its own counts in memory and periodically publishes
+    them to `<directory>/worker-<id>.json`. Files are keyed by worker id,
+    so a restarted worker overwrites the snapshot of the one it replaces.
+    Global views read every snapshot and are cached for one publish interval.
+    """
+
+    def __init__(self, directory, worker_id, publish_interval_ms):
+        self.directory = directory
+        self.worker_id = worker_id
+        self.publish_interval = publish_interval_ms / 1000
+        self.connections = 0
+        self.users = Counter()
+        self._path = os.path.join(directory, f"worker-{worker_id}.json")
+        self._dirty = True
+        self._snapshots = None
+        self._snapshots_read_at = 0
+        self._publisher = None
+
+    def start(self):
+        """Publish the initial snapshot and keep publishing changes periodically."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.publish()
+        self._publisher = PeriodicCallback(self.publish, self.publish_interval * 1000)
+        self._publisher.start()
+
+    def stop(self):
+        """Stop publishing and remove this worker's snapshot."""
+        if self._publisher is not None:
+            self._publisher.stop()
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+    def connection_opened(self):
+        self.connections += 1
+        self._dirty = True
+
+    def connection_closed(self):
+        self.connections -= 1
+        self._dirty = True
+
+    def user_connected(self, user_id):
+        self.users[user_id] += 1
+        self._dirty = True
+
+    def user_disconnected(self, user_id):
+        self.users[user_id] -= 1
+        if self.users[user_id] <= 0:
+            del self.users[user_id]
+        self._dirty = True
+
+    def publish(self):
+        """Write this worker's snapshot atomically if it changed."""
+        if not self._dirty:
+            return
+        snapshot = {
+            "pid": os.getpid(),
+            "connections": self.connections,
+            "users": dict(self.users),
+        }
+        tmp_path = f"{self._path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self._path)
+            self._dirty = False
+        except OSError as e:
+            logger.error(f"Could not publish connection registry: {e}")
+
+    def _read_snapshots(self):
+        now = time.monotonic()
+        if self._snapshots is not None and now - self._snapshots_read_at < self.publish_interval:
+            return self._snapshots
+
+        snapshots = {}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not (name.startswith("worker-") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    snapshots[name[len("worker-"):-len(".json")]] = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+        # Our own counts are always current
+        snapshots[str(self.worker_id)] = {"connections": self.connections, "users": dict(self.users)}
+        self._snapshots = snapshots
+        self._snapshots_read_at = now
+        return snapshots
+
+    def global_connections(self):
+        """Total open WebSocket connections across all workers."""
+        return sum(s.get("connections", 0) for s in self._read_snapshots().values())
+
+    def global_users(self):
+        """Number of distinct authenticated users across all workers."""
+        users = set()
+        for snapshot in self._read_snapshots().values():
+            users.update(snapshot.get("users", {}))
+        return len(users)
+
+    def find_user(self, user_id):
+        """
+        Return {worker_id: socket_count} for the workers holding sockets of `user_id`.
+        """
+        return {
+            worker_id: snapshot["users"][user_id]
+            for worker_id, snapshot in self._read_snapshots().items()
+            if user_id in snapshot.get("users", {})
+        }
@@ -0,0 +1,177 @@
+import time
+import logging
+from collections import OrderedDict, deque
+
+from utils.token_utils import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+def split_history(history, keep_recent):
+    """
+    Split a history into its latest summary and the messages it does not cover.
+
+    A summary is stored as a 'system' message right after the turns it was
+    written from, and covers everything before it except the `keep_recent`
+    messages immediately preceding it, which stay verbatim.
+
+    Returns:
+        tuple: (summary entry or None, uncovered messages oldest first).
+    """
+    for index in range(len(history) - 1, -1, -1):
+        if history[index]["role"] == "system":
+            start = max(0, index - keep_recent)
+            return history[index], history[start:index] + history[index + 1:]
+    return None, list(history)
+
+class ConversationHistoryCache:
+    """
+    In-memory, LRU-evicted cache of recent messages per conversation.
+
+    Each cached message stores its token estimate so fitting the history
+    into a budget never re-tokenizes old turns. Conversations whose history
+    could not be loaded are remembered for a short time so every prompt
+    does not repeat the failed round trip.
+    """
+
+    def __init__(self, max_conversations, max_messages, failure_ttl=10):
+        """
+        Args:
+            max_conversations (int): Conversations kept before evicting the least recently used.
+            max_messages (int): Most recent messages kept per conversation.
+            failure_ttl (float): Seconds before a failed load is retried.
+        """
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.failure_ttl = failure_ttl
+        self._histories = OrderedDict()
+        self._failures = OrderedDict()
+
+    def __contains__(self, conversation_id):
+        return conversation_id in self._histories
+
+    def get(self, conversation_id):
+        """Return the cached messages of a conversation, oldest first, or None on a miss."""
+        history = self._histories.get(conversation_id)
+        if history is None:
+            return None
+        self._histories.move_to_end(conversation_id)
+        return list(history)
+
+    def set(self, conversation_id, messages):
+        """Replace the cached history of a conversation with `messages` (oldest first)."""
+        history = deque(maxlen=self.max_messages)
+        for message in messages:
+            history.append(self._entry(message["role"], message["content"]))
+        self._histories[conversation_id] = history
+        self._histories.move_to_end(conversation_id)
+        self._failures.pop(conversation_id, None)
+        self._evict()
+
+    def append(self, conversation_id, role, content):
+        """Append a message to a cached conversation; ignored if it is not cached."""
+        history = self._histories.get(conversation_id)
+        if history is None:
+            return
+        history.append(self._entry(role, content))
+        self._histories.move_to_end(conversation_id)
+
+    def discard(self, conversation_id):
+        """Drop a conversation from the cache."""
+        self._histories.pop(conversation_id, None)
+
+    def mark_failed(self, conversation_id):
+        """Remember that loading a conversation's history just failed."""
+        self._failures.pop(conversation_id, None)
+        self._failures[conversation_id] = time.monotonic() + self.failure_ttl
+        while len(self._failures) > self.max_conversations:
+            self._failures.popitem(last=False)
+
+    def recently_failed(self, conversation_id):
+        """Return True if loading the conversation failed less than `failure_ttl` seconds ago."""
+        retry_at = self._failures.get(conversation_id)
+        if retry_at is None:
+            return False
+        if time.monotonic() >= retry_at:
+            del self._failures[conversation_id]
+            return False
+        return True
+
+    def _entry(self, role, content):
+        return {"role": role, "content": content, "tokens": estimate_message_tokens(content)}
+
+    def _evict(self):
+        while len(self._histories) > self.max_conversations:
+            conversation_id, _ = self._histories.popitem(last=False)
+            logger.debug(f"Evicted conversation {conversation_id} from history cache")
+
+class ContextBuilder:
+    """Assemble the conversation context sent to the LLM for each turn."""
+
+    def __init__(self, cache, message_service, token_budget, keep_recent=0):
+        """
+        Args:
+            cache (ConversationHistoryCache): Shared history cache.
+            message_service (MessageService): Used to warm the cache on a miss.
+            token_budget (int): Maximum prompt tokens, including the new prompt.
+            keep_recent (int): Messages kept verbatim before a stored summary.
+        """
+        self.cache = cache
+        self.message_service = message_service
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+
+    async def warm(self, user_id, conversation_id):
+        """
+        Load the recent history of a conversation into the cache if it is missing.
+
+        After a failed load the conversation is answered without history
+        until the failure expires, instead of retrying on every prompt.
+        """
+        if conversation_id in self.cache or self.cache.recently_failed(conversation_id):
+            return
+        messages = await self.message_service.get_recent_messages(
+            user_id, conversation_id, self.cache.max_messages)
+        if messages is None:
+            logger.warning(f"Could not load history of conversation {conversation_id}")
+            self.cache.mark_failed(conversation_id)
+            return
+        self.cache.set(conversation_id, messages)
+
+    def start(self, conversation_id):
+        """Start an empty history for a newly created conversation."""
+        self.cache.set(conversation_id, [])
+
+    def record(self, conversation_id, role, content):
+        """Record a finished message of the conversation."""
+        self.cache.append(conversation_id, role, content)
+
+    async def build(self, user_id, conversation_id, prompt):
+        """
+        Return the messages to send for `prompt`, oldest first.
+
+        The latest summary replaces the turns it covers. The newest history
+        is kept and older turns are dropped once the token budget is reached.
+        The summary and the prompt itself are always included.
+        """
+        await self.warm(user_id, conversation_id)
+        summary, history = split_history(
+            self.cache.get(conversation_id) or [], self.keep_recent)
+
+        remaining = self.token_budget - estimate_message_tokens(prompt)
+        if summary is not None:
+            remaining -= summary["tokens"]
+
+        context = []
+        for message in reversed(history):
+            remaining -= message["tokens"]
+            if remaining < 0:
+                break
+            context.append({"role": message["role"], "content": message["content"]})
+        if summary is not None:
+            context.append({"role": "system", "content": SUMMARY_HEADER + summary["content"]})
+        context.reverse()
+
+        context.append({"role": "user", "content": prompt})
+        return context
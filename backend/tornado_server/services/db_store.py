@@ -0,0 +1,293 @@
+import uuid
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from utils import metrics
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+INSERT_MESSAGES = """
+    INSERT INTO messages (id, conversation_id, role, content, created_at)
+    SELECT m.id, m.conversation_id, m.role, m.content, m.created_at
+    FROM unnest($1::uuid[], $2::uuid[], $3::uuid[], $4::text[], $5::text[], $6::timestamptz[])
+        AS m(id, conversation_id, user_id, role, content, created_at)
+    JOIN conversations c ON c.id = m.conversation_id AND c.deleted_at IS NULL
+    -- Records queued without a user come from the server itself and are trusted
+    WHERE (m.user_id IS NULL OR c.user_id = m.user_id)
+      -- created_at is part of the key, so a retry stamped differently would
+      -- not conflict; ids already stored are skipped explicitly
+      AND NOT EXISTS (SELECT 1 FROM messages e WHERE e.id = m.id)
+    ON CONFLICT (id, created_at) DO NOTHING
+    RETURNING id, conversation_id
+"""
+
+def _parse_uuid(value):
+    """Return `value` as a UUID, or None if it is not one."""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+def _serialize(row):
+    """Convert a database row to the JSON-ready dict the Flask API would return."""
+    result = {}
+    for key, value in row.items():
+        if isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        result[key] = value
+    return result
+
+class DatabaseMessageStore:
+    """
+    Direct Postgres access for conversations and messages.
+
+    A drop-in for MessageService that skips the HTTP hop through the Flask
+    API. It uses its own asyncpg pool against the schema owned by the Flask
+    models, and checks ownership in SQL the same way the API does.
+    """
+
+    def __init__(self, config):
+        """Initialize the store from the server configuration."""
+        if asyncpg is None:
+            raise RuntimeError("MESSAGE_STORE=database requires the asyncpg package")
+        self.dsn = config.DATABASE_URL
+        self.min_size = config.DB_POOL_MIN_SIZE
+        self.max_size = config.DB_POOL_MAX_SIZE
+        self.command_timeout = config.DB_COMMAND_TIMEOUT
+        self.max_inactive_lifetime = config.DB_MAX_INACTIVE_CONNECTION_LIFETIME
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+        self._closed = False
+
+    async def _get_pool(self):
+        """Return the connection pool, creating it on first use on the running loop."""
+        if self._closed:
+            raise RuntimeError("Database message store is closed")
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        command_timeout=self.command_timeout,
+                        max_inactive_connection_lifetime=self.max_inactive_lifetime,
+                    )
+                    logger.info("Opened database connection pool")
+        return self._pool
+
+    async def create_conversation(self, user_id, title):
+        """Create a new conversation owned by `user_id`."""
+        user_uuid = _parse_uuid(user_id)
+        if user_uuid is None:
+            logger.error(f"Invalid user id {user_id}")
+            return None
+
+        try:
+            pool = await self._get_pool()
+            row = await pool.fetchrow(
+                """
+                INSERT INTO conversations (user_id, title)
+                VALUES ($1, $2)
+                RETURNING id, user_id, title, created_at, updated_at
+                """,
+                user_uuid, title)
+            return _serialize(row)
+        except Exception as e:
+            logger.exception(f"Error creating conversation: {e}")
+            return None
+
+    async def get_conversation(self, user_id, conversation_id):
+        """Get a conversation if it exists and belongs to `user_id`."""
+        user_uuid = _parse_uuid(user_id)
+        conversation_uuid = _parse_uuid(conversation_id)
+        if user_uuid is None or conversation_uuid is None:
+            return None
+
+        try:
+            pool = await self._get_pool()
+            row = await pool.fetchrow(
+                """
+                SELECT id, user_id, title, created_at, updated_at
+                FROM conversations
+                WHERE id = $1 AND user_id = $2 AND deleted_at IS NULL
+                """,
+                conversation_uuid, user_uuid)
+        except Exception as e:
+            logger.exception(f"Error getting conversation: {e}")
+            return None
+
+        if row is None:
+            logger.warning(f"Conversation {conversation_id} not found")
+            return None
+        return _serialize(row)
+
+    async def get_recent_messages(self, user_id, conversation_id, limit):
+        """
+        Get the most recent messages of a conversation owned by `user_id`.
+
+        Returns:
+            list: Messages oldest first, or None on failure.
+        """
+        user_uuid = _parse_uuid(user_id)
+        conversation_uuid = _parse_uuid(conversation_id)
+        if user_uuid is None or conversation_uuid is None:
+            return None
+
+        try:
+            pool = await self._get_pool()
+            # Bring archived conversations back before reading their messages
+            await pool.execute(
+                """
+                SELECT rehydrate_conversation(id)
+                FROM conversations
+                WHERE id = $1 AND user_id = $2 AND archived_at IS NOT NULL
+                """,
+                conversation_uuid, user_uuid)
+            rows = await pool.fetch(
+                """
+                SELECT m.id, m.conversation_id, m.role, m.content, m.created_at
+                FROM messages m
+                JOIN conversations c ON c.id = m.conversation_id
+                WHERE m.conversation_id = $1 AND c.user_id = $2 AND c.deleted_at IS NULL
+                ORDER BY m.created_at DESC, m.id DESC
+                LIMIT $3
+                """,
+                conversation_uuid, user_uuid, limit)
+        except Exception as e:
+            logger.exception(f"Error getting messages: {e}")
+            return None
+        return [_serialize(row) for row in reversed(rows)]
+
+    async def save_messages(self, records):
+        """
+        Save a batch of queued messages in one transaction.
+
+        Messages for conversations the user does not own are dropped, and ids
+        stored by an earlier attempt are skipped, as in the Flask batch API.
+        If the database rejects the batch, its rows are saved one by one so
+        only the bad ones are dropped.
+
+        Returns:
+            list: The records that should be retried.
+        """
+        rows = self._prepare(records)
+        if not rows:
+            return []
+
+        retry = []
+        rejected = []
+        started_at = time.perf_counter()
+        try:
+            inserted = await self._insert(rows)
+        except (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError) as e:
+            if len(rows) > 1:
+                logger.warning(f"Batch of {len(rows)} messages rejected, saving them one by one: {e}")
+            inserted, retry, rejected = await self._insert_one_by_one(rows)
+        except Exception as e:
+            logger.exception(f"Error saving messages: {e}")
+            return [record for record, _ in rows]
+        finally:
+            metrics.PERSISTENCE_LATENCY.observe(time.perf_counter() - started_at)
+
+        skipped = len(rows) - inserted - len(retry) - len(rejected)
+        if skipped > 0:
+            logger.info(f"Skipped {skipped} messages already stored or for unowned conversations")
+        return retry
+
+    def _prepare(self, records):
+        """
+        Convert queued records to rows of INSERT_MESSAGES column values.
+
+        Records that can never be stored are logged and left out.
+
+        Returns:
+            list: (record, values) pairs.
+        """
+        # Records without a timestamp keep the batch order when sorting by created_at
+        now = datetime.now(timezone.utc)
+        rows = []
+        seen = set()
+        for index, record in enumerate(records):
+            message_id = _parse_uuid(record.get("id"))
+            conversation_id = _parse_uuid(record.get("conversation_id"))
+            user_id = record.get("user_id")
+            user_uuid = _parse_uuid(user_id) if user_id else None
+            if message_id is None or conversation_id is None or (user_id and user_uuid is None):
+                logger.error(
+                    f"Dropping message {record.get('id')} with an invalid id "
+                    f"(conversation {record.get('conversation_id')}, user {user_id})")
+                continue
+            if message_id in seen:
+                continue
+            seen.add(message_id)
+
+            created_at = record.get("created_at")
+            try:
+                created_at = datetime.fromisoformat(created_at) if created_at else now + timedelta(microseconds=index)
+            except (TypeError, ValueError):
+                logger.error(f"Dropping message {message_id} with an invalid created_at: {created_at}")
+                continue
+
+            values = (
+                message_id,
+                conversation_id,
+                user_uuid,
+                record.get("role"),
+                record.get("content"),
+                created_at,
+            )
+            rows.append((record, values))
+        return rows
+
+    async def _insert(self, rows):
+        """Insert rows in one transaction and return how many were stored."""
+        columns = [list(column) for column in zip(*(values for _, values in rows))]
+        pool = await self._get_pool()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                inserted = await connection.fetch(INSERT_MESSAGES, *columns)
+                touched = list({row["conversation_id"] for row in inserted})
+                if touched:
+                    await connection.execute(
+                        "UPDATE conversations SET updated_at = NOW() WHERE id = ANY($1::uuid[])",
+                        touched)
+        return len(inserted)
+
+    async def _insert_one_by_one(self, rows):
+        """
+        Insert rows separately so one bad message does not sink the rest.
+
+        Returns:
+            tuple: (inserted count, records to retry, records dropped).
+        """
+        inserted = 0
+        retry = []
+        dropped = []
+        for record, values in rows:
+            try:
+                inserted += await self._insert([(record, values)])
+            except (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError) as e:
+                # Bad data will not succeed on retry
+                logger.error(f"Dropping message {record.get('id')}: {e}")
+                dropped.append(record)
+            except Exception as e:
+                logger.exception(f"Error saving message {record.get('id')}: {e}")
+                retry.append(record)
+        return inserted, retry, dropped
+
+    async def close(self):
+        """Close the connection pool."""
+        self._closed = True
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
@@ -0,0 +1,61 @@
+import logging
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+class HTTPClientManager:
+    """Process-wide pool of aiohttp sessions, one per upstream host."""
+
+    def __init__(self, config):
+        """Initialize the client manager from the server configuration."""
+        self.limit = config.HTTP_POOL_LIMIT
+        self.limit_per_host = config.HTTP_POOL_LIMIT_PER_HOST
+        self.keepalive_timeout = config.HTTP_KEEPALIVE_TIMEOUT
+        self.dns_cache_ttl = config.HTTP_DNS_CACHE_TTL
+        self._sessions = {}
+        self._closed = False
+
+    @staticmethod
+    def _origin(url):
+        """Return the scheme://host:port key used to select a pool."""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        return f"{parts.scheme}://{parts.hostname}:{port}"
+
+    def session_for(self, url):
+        """
+        Return the shared session for the host of `url`.
+
+        Sessions are created lazily so they bind to the running event loop.
+        """
+        if self._closed:
+            raise RuntimeError("HTTP client manager is closed")
+
+        origin = self._origin(url)
+        session = self._sessions.get(origin)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector, json_serialize=json_codec.dumps)
+            self._sessions[origin] = session
+            logger.info(f"Opened HTTP connection pool for {origin}")
+        return session
+
+    async def close(self):
+        """Close every pooled session and its connections."""
+        self._closed = True
+        sessions, self._sessions = self._sessions, {}
+        for origin, session in sessions.items():
+            if not session.closed:
+                await session.close()
+                logger.info(f"Closed HTTP connection pool for {origin}")
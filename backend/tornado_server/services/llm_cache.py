@@ -0,0 +1,219 @@
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class _InFlight:
+    """Tokens of an upstream call that identical requests are following."""
+
+    def __init__(self, key):
+        self.key = key
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.task = None
+
+    def publish(self):
+        # Wake up every follower, then re-arm for the next token
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+class LLMResponseCache:
+    """
+    Opt-in exact-match cache of LLM responses.
+
+    Responses are keyed by the model settings and a hash of the normalized
+    context. Caching applies only to deterministic requests (temperature 0)
+    unless an explicit TTL is configured. Identical concurrent deterministic
+    requests are single-flighted: they all stream the tokens of one upstream
+    call, which runs in its own task and is only cancelled once every request
+    following it has gone, so one user's cancel never fails another user's
+    response. Sampled requests cached under a TTL each make their own call.
+    """
+
+    def __init__(self, ttl, max_entries, max_bytes, follow_timeout=60):
+        """
+        Args:
+            ttl (float): Seconds a response stays cached; 0 means no explicit TTL.
+            max_entries (int): Maximum cached responses.
+            max_bytes (int): Memory cap for cached response text.
+            follow_timeout (float): Seconds a request joining another's call
+                waits for its next token before giving up on it.
+        """
+        self.ttl = ttl
+        self.follow_timeout = follow_timeout
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._inflight = {}
+
+    def is_cacheable(self, temperature):
+        """Only deterministic settings are cached unless an explicit TTL is set."""
+        return temperature == 0 or self.ttl > 0
+
+    @staticmethod
+    def make_key(model, temperature, max_tokens, messages):
+        """Build the cache key from the model settings and the normalized context."""
+        normalized = [
+            [m["role"], " ".join(m["content"].split())] for m in messages
+        ]
+        raw = json.dumps([model, temperature, max_tokens, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def stream(self, key, produce, temperature=0):
+        """
+        Yield the response tokens for `key`.
+
+        Args:
+            key (str): Key from make_key.
+            produce (callable): Returns the async iterator of upstream tokens on a miss.
+            temperature (float): Sampling temperature; only deterministic
+                requests share an upstream call with identical ones in flight.
+        """
+        tokens = self._get(key)
+        if tokens is not None:
+            self.hits += 1
+            for i, token in enumerate(tokens):
+                yield token
+                if i % 64 == 63:
+                    # Let other sockets run while replaying long responses
+                    await asyncio.sleep(0)
+            return
+
+        if temperature != 0:
+            self.misses += 1
+            tokens = []
+            async for token in produce():
+                tokens.append(token)
+                yield token
+            self._put(key, tokens)
+            return
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            async for token in self._follow_or_fallback(inflight, produce):
+                yield token
+            return
+
+        self.misses += 1
+        inflight = _InFlight(key)
+        self._inflight[key] = inflight
+        inflight.task = asyncio.ensure_future(self._produce(inflight, produce))
+        async for token in self._follow(inflight):
+            yield token
+
+    async def _produce(self, inflight, produce):
+        """Run the upstream call, publishing every token to the requests following it."""
+        try:
+            async for token in produce():
+                inflight.tokens.append(token)
+                inflight.publish()
+            self._put(inflight.key, inflight.tokens)
+        except asyncio.CancelledError as e:
+            inflight.error = e
+            raise
+        except Exception as e:
+            # Reported to the followers; nobody awaits this task
+            inflight.error = e
+        finally:
+            inflight.done = True
+            inflight.publish()
+            self._release(inflight)
+
+    def _release(self, inflight):
+        if self._inflight.get(inflight.key) is inflight:
+            del self._inflight[inflight.key]
+
+    async def _follow_or_fallback(self, inflight, produce):
+        """
+        Follow another request's upstream call, making our own if it fails or stalls.
+
+        The fallback only happens before any token has been passed on: a new
+        call is not guaranteed to reproduce the text already sent, so after
+        that the failure is raised instead.
+        """
+        sent = False
+        try:
+            async for token in self._follow(inflight, self.follow_timeout):
+                sent = True
+                yield token
+            return
+        except asyncio.TimeoutError:
+            if sent:
+                raise Exception("Shared LLM request stalled")
+            logger.warning("Shared LLM request stalled, falling back to a separate call")
+        except Exception as e:
+            if sent:
+                raise
+            logger.warning(f"Shared LLM request failed, falling back to a separate call: {e!r}")
+
+        async for token in produce():
+            yield token
+
+    async def _follow(self, inflight, timeout=None):
+        """
+        Stream the tokens of a shared upstream call as they arrive.
+
+        Raises the call's error, or asyncio.TimeoutError if no token arrives
+        within `timeout` seconds.
+        """
+        inflight.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(inflight.tokens):
+                    yield inflight.tokens[index]
+                    index += 1
+                if inflight.done:
+                    break
+                await asyncio.wait_for(inflight.changed.wait(), timeout)
+        finally:
+            inflight.subscribers -= 1
+            if inflight.subscribers == 0 and not inflight.done:
+                # Nobody is reading the response any more; new requests
+                # start a fresh call instead of joining this one
+                self._release(inflight)
+                inflight.task.cancel()
+
+        if isinstance(inflight.error, asyncio.CancelledError):
+            # Only reachable by joining a call in the instant it was abandoned
+            raise Exception("Shared LLM request was cancelled")
+        if inflight.error is not None:
+            raise inflight.error
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        tokens, size, expires_at = entry
+        if expires_at is not None and time.monotonic() > expires_at:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return tokens
+
+    def _put(self, key, tokens):
+        size = sum(len(token.encode("utf-8")) for token in tokens)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        self._remove(key)
+        self._entries[key] = (list(tokens), size, expires_at)
+        self._size += size
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
@@ -1,27 +1,91 @@
 import logging
 import asyncio
-import json
-import aiohttp
+import time
 from config import get_config
+from utils.sse_parser import SSEParser, extract_token
+from utils import json_codec
+from utils import metrics
 
 logger = logging.getLogger(__name__)
 config = get_config()
 
+ROLE_LABELS = {
+    "system": "System",
+    "user": "User",
+    "assistant": "Assistant",
+}
+
 class LLMService:
     """Service to interact with LLM"""
 
-    def __init__(self):
+    def __init__(self, http_client, admission, response_cache=None):
         """Initialize the LLM service"""
+        self.http_client = http_client
+        self.admission = admission
+        self.response_cache = response_cache
         self.api_url = config.LLM_API_URL
         self.api_key = config.LLM_API_KEY
         self.model = config.LLM_MODEL
         self.temperature = config.LLM_TEMPERATURE
         self.max_tokens = config.LLM_MAX_TOKENS
 
-    async def stream_completion(self, prompt):
+    def format_prompt(self, messages):
+        """Render chat messages as a completion prompt ending with the assistant's turn."""
+        turns = [f"{ROLE_LABELS.get(m['role'], 'User')}: {m['content']}" for m in messages]
+        turns.append(f"{ROLE_LABELS['assistant']}:")
+        return "\n\n".join(turns)
+
+    async def stream_completion(self, messages, user_id, on_queued=None):
+        """
+        Stream the completion, served from the response cache when possible.
+
+        Args:
+            messages (list): Conversation context, oldest first, ending with the user prompt.
+            user_id (str): Requesting user, for fair admission to the upstream API.
+            on_queued (callable): Called with the queue position while waiting for a slot.
+        """
+        def produce():
+            return self._stream_admitted(messages, user_id, on_queued)
+
+        cache = self.response_cache
+        if cache is None or not cache.is_cacheable(self.temperature):
+            async for token in produce():
+                yield token
+            return
+
+        key = cache.make_key(self.model, self.temperature, self.max_tokens, messages)
+        async for token in cache.stream(key, produce, self.temperature):
+            yield token
+
+    async def complete(self, messages, user_id, max_tokens=None):
+        """
+        Return the full completion for background work such as summarization.
+
+        It bypasses the response cache but still goes through admission
+        control, so it shares the upstream capacity fairly with chat turns.
+
+        Args:
+            messages (list): Context, oldest first.
+            user_id (str): User the work is done for.
+            max_tokens (int): Completion limit; defaults to LLM_MAX_TOKENS.
+        """
+        parts = []
+        async for token in self._stream_admitted(messages, user_id, None, max_tokens):
+            parts.append(token)
+        return "".join(parts)
+
+    async def _stream_admitted(self, messages, user_id, on_queued, max_tokens=None):
+        """Hold an admission slot for the whole upstream call."""
+        async with self.admission.admit(user_id, on_position=on_queued):
+            async for token in self._stream_upstream(messages, max_tokens):
+                yield token
+
+    async def _stream_upstream(self, messages, max_tokens=None):
         """
         Stream the completion from the LLM API.
         """
+        prompt = self.format_prompt(messages)
+
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -31,42 +95,45 @@ class LLMService:
         payload = {
            "model": self.model,
            "prompt": prompt,
-           "max_tokens": self.max_tokens,
+           "max_tokens": max_tokens or self.max_tokens,
            "temperature": self.temperature,
            "stream" : True
         }
 
+        started_at = time.perf_counter()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=60
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"LLM API error: {response.status}, {error_text}")
-                        raise Exception(f"LLM API error: {response.error}")
-                    
-                    # Parse the streaming response
-                    # This will be different depending on the LLM provider's API
-                    async for line in response.content:
-                        line = line.decode("utf-8").strip()
-                        if line.startswith("data: "):
-                            data = line[6:]
-                            if data.startswith("[DONE]"):
-                                break
-                            try:
-                                json_data = json.loads(data)
-                                token = json_data.get("choices", [{}])[0].get("text", "")
-                                if token:
-                                    yield token
-                            except json.JSONDecodeError:
-                                logger.warning(f"Could not parse LLM response: {data}")
+            session = self.http_client.session_for(self.api_url)
+            async with session.post(
+                self.api_url,
+                headers=headers,
+                json=payload,
+                timeout=60
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"LLM API error: {response.status}, {error_text}")
+                    raise Exception(f"LLM API error: {response.status}")
+                
+                # Parse the event stream incrementally from raw network chunks
+                parser = SSEParser()
+                async for chunk in response.content.iter_any():
+                    for event in parser.feed(chunk):
+                        if event.data == b"[DONE]":
+                            return
+                        try:
+                            token = extract_token(json_codec.loads(event.data))
+                        except (ValueError, AttributeError):
+                            logger.warning(f"Could not parse LLM response: {event.data!r}")
+                            continue
+                        if token:
+                            yield token
         except asyncio.TimeoutError:
             logger.error("LLM API request timed out")
+            metrics.LLM_UPSTREAM_ERRORS.inc()
             raise Exception("Request to LLM service timed out")
         except Exception as e:
             logger.error(f"Error calling LLM API: {e}")
-            raise
\ No newline at end of file
+            metrics.LLM_UPSTREAM_ERRORS.inc()
+            raise
+        finally:
+            metrics.LLM_UPSTREAM_LATENCY.observe(time.perf_counter() - started_at)
\ No newline at end of file
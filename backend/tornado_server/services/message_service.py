@@ -1,7 +1,9 @@
 import logging
-import aiohttp
-import json
+import time
 from config import get_config
+from services.auth_service import create_service_token
+from utils import json_codec
+from utils import metrics
 
 logger = logging.getLogger(__name__)
 config = get_config()
@@ -9,35 +11,43 @@ config = get_config()
 class MessageService:
     """Service to interact with Flask API for message storage."""
 
-    def __init__(self):
+    def __init__(self, http_client):
         """Initialize the message service."""
+        self.http_client = http_client
         self.api_base_url = config.FLASK_API_URL
 
+    def _headers(self, user_id):
+        """Return request headers authenticating a call made on behalf of `user_id`."""
+        # Reads must see this server's own recent writes, so skip the replicas
+        headers = {"Content-Type": "application/json", "X-Read-Primary": "1"}
+        if user_id:
+            headers["Authorization"] = f"Bearer {create_service_token(user_id)}"
+        return headers
+
     async def create_conversation(self, user_id, title):
         """Create a new conversation via Flask API."""
         url = f"{self.api_base_url}/api/conversations/"
-        headers = {"Content-Type": "application/json"}
+        headers = self._headers(user_id)
 
-        # Create JWT token for Flask API auth
         payload = {
             "title": title,
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers=headers,
-                    json=payload,
-                    timeout=10,
-                ) as response:
-                    if response.status != 201:
-                        error_text = await response.text()
-                        logger.error(f"Failed to create conversation: {response.status}, {error_text}")
-                        return None
-                    
-                    response_data = await response.json()
-                    return response_data.get("conversation")
+            session = self.http_client.session_for(url)
+            async with session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=10,
+            ) as response:
+                if response.status != 201:
+                    error_text = await response.text()
+                    logger.error(f"Failed to create conversation: {response.status}, {error_text}")
+                    return None
+                
+                response_data = await response.json(loads=json_codec.loads)
+                return response_data.get("conversation")
         
         except Exception as e:
             logger.exception(f"Error creating conversation: {e}")
@@ -48,55 +58,123 @@ class MessageService:
         url = f"{self.api_base_url}/api/conversations/{conversation_id}"
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    timeout=10,
-                    ) as response:
-                    if response.status != 200:
-                        if response.status == 404:
-                            logger.warning(f"Conversation {conversation_id} not found")
-                        else:
-                            error_text = await response.text()
-                            logger.error(f"Failed to get conversation: {response.status}, {error_text}")
-                        return None
-                    
-                    response_data = await response.json()
-                    return response.get('conversation')
+            session = self.http_client.session_for(url)
+            async with session.get(
+                url,
+                headers=self._headers(user_id),
+                timeout=10,
+                ) as response:
+                if response.status != 200:
+                    if response.status == 404:
+                        logger.warning(f"Conversation {conversation_id} not found")
+                    else:
+                        error_text = await response.text()
+                        logger.error(f"Failed to get conversation: {response.status}, {error_text}")
+                    return None
+                
+                response_data = await response.json(loads=json_codec.loads)
+                return response_data.get('conversation')
         except Exception as e:
             logger.exception(f"Error getting conversation: {e}")
             return None
     
-    async def save_message(self, conversation_id, role, content):
-        """Save a message to the database via Flask API."""
-        if role == "user":
-            url = f"{self.api_base_url}/api/messages/"
-        else:
-            url = f"{self.api_base_url}/api/messages/assistant"
-
-        headers = {
-            "Content-Type": "application/json",
-        }
+    async def get_recent_messages(self, user_id, conversation_id, limit):
+        """
+        Get the most recent messages of a conversation from Flask API.
 
-        payload = {
-            "conversation_id": conversation_id,
-            "content": content,
-        }
+        Returns:
+            list: Messages oldest first, or None on failure.
+        """
+        url = f"{self.api_base_url}/api/conversations/{conversation_id}"
+        params = {"order": "desc", "limit": limit}
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers=headers,
-                    json=payload,
-                    timeout=10,
-                ) as response:
-                    if response.status != 201:
-                        error_text = await response.text()
-                        logger.error(f"Failed to save message: {response.status}, {error_text}")
-                        return False
-                    
-                    return True
+            session = self.http_client.session_for(url)
+            async with session.get(
+                url,
+                params=params,
+                headers=self._headers(user_id),
+                timeout=10,
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Failed to get messages: {response.status}, {error_text}")
+                    return None
+
+                response_data = await response.json(loads=json_codec.loads)
+                return list(reversed(response_data.get("messages", [])))
+        except Exception as e:
+            logger.exception(f"Error getting messages: {e}")
+            return None
+
+    async def save_messages(self, records):
+        """
+        Save a batch of queued messages, one request per user.
+
+        The API checks ownership against the token's user, so each user's
+        messages are sent with a token for that user. Anything the API does
+        not confirm as stored, rejected or invalid is returned for retry.
+
+        Returns:
+            list: The records that should be retried.
+        """
+        by_user = {}
+        for record in records:
+            by_user.setdefault(record.get("user_id"), []).append(record)
+
+        failed = []
+        for user_id, batch in by_user.items():
+            if not user_id:
+                # Cannot be authenticated; keep them so they end up spilled
+                logger.error(f"Cannot save {len(batch)} messages queued without a user")
+                failed.extend(batch)
+                continue
+            failed.extend(await self._save_user_messages(user_id, batch))
+        return failed
+
+    async def _save_user_messages(self, user_id, records):
+        """Save the messages of one user in a single request, returning those to retry."""
+        url = f"{self.api_base_url}/api/messages/batch"
+        payload = {"messages": records}
+
+        started_at = time.perf_counter()
+        try:
+            session = self.http_client.session_for(url)
+            async with session.post(
+                url,
+                headers=self._headers(user_id),
+                json=payload,
+                timeout=10,
+            ) as response:
+                if response.status != 201:
+                    # Nothing is confirmed stored, including on 401 and 403
+                    error_text = await response.text()
+                    logger.error(f"Failed to save messages: {response.status}, {error_text}")
+                    return records
+
+                response_data = await response.json(loads=json_codec.loads)
         except Exception as e:
-            logger.exception(f"Error saving message: {e}")
-            return False
\ No newline at end of file
+            logger.exception(f"Error saving messages: {e}")
+            return records
+        finally:
+            metrics.PERSISTENCE_LATENCY.observe(time.perf_counter() - started_at)
+
+        settled = set(response_data.get("ids", []))
+        rejected = response_data.get("rejected", [])
+        if rejected:
+            logger.warning(f"Flask API rejected {len(rejected)} messages for unknown conversations")
+            settled.update(rejected)
+
+        # Invalid messages will not succeed on retry
+        invalid = set()
+        for item in response_data.get("invalid", []):
+            logger.error(f"Flask API rejected message {item.get('id')}: {item.get('error')}")
+            invalid.add(item.get("index"))
+
+        return [
+            record for index, record in enumerate(records)
+            if index not in invalid and record.get("id") not in settled
+        ]
+
+    async def close(self):
+        """Nothing to release; the shared HTTP client is closed separately."""
@@ -0,0 +1,164 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+class PersistenceQueue:
+    """
+    Write-behind queue for chat messages.
+
+    Messages are accepted without waiting on the Flask API, grouped into
+    batches by size or time and written by a single background worker.
+    Every message carries an idempotency key (its message id) so retried
+    writes never create duplicates.
+    """
+
+    def __init__(self, writer, config):
+        """
+        Args:
+            writer (coroutine function): Persists a list of records and
+                returns the records that failed.
+            config: Server configuration.
+        """
+        self.writer = writer
+        self.batch_size = config.PERSIST_BATCH_SIZE
+        self.flush_interval = config.PERSIST_FLUSH_INTERVAL_MS / 1000
+        self.max_retries = config.PERSIST_MAX_RETRIES
+        self.retry_backoff = config.PERSIST_RETRY_BACKOFF
+        self.spill_path = config.PERSIST_SPILL_PATH
+        self._queue = asyncio.Queue(maxsize=config.PERSIST_QUEUE_MAXSIZE)
+        self._inflight = []
+        self._worker = None
+        self._closed = False
+
+    @property
+    def depth(self):
+        """Number of messages waiting to be written, including in-flight ones."""
+        return self._queue.qsize() + len(self._inflight)
+
+    def start(self):
+        """Start the background worker and re-queue messages spilled on a previous shutdown."""
+        if self._worker is None:
+            records = self._load_spill()
+            for i, record in enumerate(records):
+                try:
+                    self._queue.put_nowait(record)
+                except asyncio.QueueFull:
+                    self._spill(records[i:])
+                    break
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def enqueue(self, conversation_id, role, content, message_id=None, user_id=None):
+        """
+        Queue a message for persistence and return its id.
+
+        This only waits when the queue is full, which applies backpressure
+        to the producer instead of growing memory without bound.
+        """
+        if self._closed:
+            raise RuntimeError("Persistence queue is closed")
+
+        self.start()
+        record = {
+            "id": message_id or str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            # Part of the messages primary key, so retries must keep it
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if user_id:
+            # Lets a writer that talks to the database check ownership
+            record["user_id"] = user_id
+        await self._queue.put(record)
+        return record["id"]
+
+    async def _fill_batch(self):
+        """Wait for a message, then collect more until the batch is full or the window ends."""
+        # Records are collected straight into the in-flight list so nothing
+        # is lost if the worker is cancelled while still waiting for more.
+        self._inflight.append(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(self._inflight) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                self._inflight.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        """Worker loop writing batches until cancelled."""
+        while True:
+            await self._fill_batch()
+            failed = await self._write_with_retry(self._inflight, self.max_retries)
+            if failed:
+                logger.error(f"Dropping {len(failed)} messages after {self.max_retries} retries")
+                self._spill(failed)
+            self._inflight = []
+
+    async def _write_with_retry(self, batch, max_retries):
+        """Write a batch, retrying failed records with exponential backoff."""
+        for attempt in range(max_retries + 1):
+            try:
+                batch = await self.writer(batch)
+            except Exception as e:
+                logger.exception(f"Error persisting message batch: {e}")
+            if not batch:
+                return []
+            if attempt < max_retries:
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        return batch
+
+    async def close(self):
+        """Stop accepting messages and flush everything still queued."""
+        self._closed = True
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+
+        # The in-flight batch may have been partially written; idempotency
+        # keys make it safe to send it again.
+        pending = list(self._inflight)
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._inflight = []
+
+        if pending:
+            logger.info(f"Flushing {len(pending)} queued messages before shutdown")
+            failed = await self._write_with_retry(pending, 1)
+            if failed:
+                self._spill(failed)
+
+    def _spill(self, records):
+        """Append unwritten records to the spill file so they survive a restart."""
+        if not self.spill_path:
+            return
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            logger.warning(f"Spilled {len(records)} messages to {self.spill_path}")
+        except OSError as e:
+            logger.error(f"Could not spill messages to {self.spill_path}: {e}")
+
+    def _load_spill(self):
+        """Read and clear records spilled by a previous process."""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return []
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spill_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load spilled messages from {self.spill_path}: {e}")
+            return []
+        logger.info(f"Re-queued {len(records)} spilled messages")
+        return records
@@ -0,0 +1,193 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class StreamReplayBuffer:
+    """
+    Bounded buffer of in-flight and recently finished assistant responses.
+
+    Every streamed chunk goes through the buffer, which fans it out to the
+    sockets subscribed to that response. A client that reconnects can
+    replay the chunks it missed from an offset and keep receiving the rest
+    of the stream without a new upstream LLM call.
+
+    Only finished responses are ever evicted. When `max_streams` responses
+    are all still generating, new ones are delivered to their subscribers
+    as usual but are not kept for resuming.
+    """
+
+    def __init__(self, max_streams, ttl):
+        """
+        Args:
+            max_streams (int): Responses kept for resuming; the oldest finished ones are evicted first.
+            ttl (float): Seconds a finished response stays resumable.
+        """
+        self.max_streams = max_streams
+        self.ttl = ttl
+        self._streams = OrderedDict()
+
+    def start(self, message_id, user_id, conversation_id, task=None):
+        """
+        Register a new response stream, buffering it for resume if there is room.
+
+        Args:
+            task (asyncio.Task): The task generating the response, so it can be
+                cancelled from another socket of the same user.
+        """
+        self._purge()
+        resumable = self._make_room()
+        if not resumable:
+            logger.warning(f"Replay buffer full of live streams, {message_id} cannot be resumed")
+        self._streams[message_id] = {
+            "user_id": user_id,
+            "conversation_id": conversation_id,
+            "resumable": resumable,
+            "chunk_count": 0,
+            "chunks": [],
+            "subscribers": set(),
+            "task": task,
+            "finished_at": None,
+            "error": None,
+            "cancelled": False,
+        }
+
+    def get(self, message_id, user_id):
+        """Return the stream if it is buffered for resume and belongs to `user_id`."""
+        self._purge()
+        stream = self._streams.get(message_id)
+        if stream is None or not stream["resumable"] or stream["user_id"] != user_id:
+            return None
+        return stream
+
+    def subscribe(self, message_id, send):
+        """
+        Forward future frames of a stream to `send`.
+
+        `send` is called with each frame dict and may return an awaitable.
+        """
+        stream = self._streams.get(message_id)
+        if stream is not None:
+            stream["subscribers"].add(send)
+
+    def unsubscribe(self, message_id, send):
+        stream = self._streams.get(message_id)
+        if stream is not None:
+            stream["subscribers"].discard(send)
+
+    async def append(self, message_id, chunk):
+        """Buffer a chunk and send it to every subscriber."""
+        stream = self._streams.get(message_id)
+        if stream is None:
+            return
+        index = stream["chunk_count"]
+        stream["chunk_count"] += 1
+        if stream["resumable"]:
+            stream["chunks"].append(chunk)
+        await self._fan_out(stream, {
+            "type": "assistant_response_chunk",
+            "message_id": message_id,
+            "index": index,
+            "chunk": chunk
+        })
+
+    def has_subscribers(self, message_id):
+        stream = self._streams.get(message_id)
+        return bool(stream and stream["subscribers"])
+
+    async def finish(self, message_id, error=None, cancelled=False):
+        """Mark a stream finished and send the end (or error) frame to subscribers."""
+        stream = self._streams.get(message_id)
+        if stream is None:
+            return
+        stream["finished_at"] = time.monotonic()
+        stream["task"] = None
+        stream["error"] = error
+        stream["cancelled"] = cancelled
+        await self._fan_out(stream, self._final_frame(message_id, stream))
+        stream["subscribers"].clear()
+        if not stream["resumable"]:
+            self._streams.pop(message_id, None)
+
+    def cancel(self, message_id, user_id):
+        """
+        Cancel the generation of a response owned by `user_id`.
+
+        Returns:
+            bool: True if a running generation was cancelled.
+        """
+        stream = self._streams.get(message_id)
+        if stream is None or stream["user_id"] != user_id:
+            return False
+        task = stream["task"]
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def replay(self, message_id, offset, send):
+        """
+        Send the chunks from `offset` onwards to `send`, then keep it subscribed.
+
+        Replay and subscription happen without yielding to the event loop so
+        no chunk can be missed or duplicated in between.
+        """
+        stream = self._streams[message_id]
+        pending = []
+        for index, chunk in enumerate(stream["chunks"][offset:], start=offset):
+            pending.append(send({
+                "type": "assistant_response_chunk",
+                "message_id": message_id,
+                "index": index,
+                "chunk": chunk
+            }))
+
+        if stream["finished_at"] is None:
+            stream["subscribers"].add(send)
+        else:
+            pending.append(send(self._final_frame(message_id, stream)))
+
+        await asyncio.gather(*[p for p in pending if p is not None], return_exceptions=True)
+
+    def _final_frame(self, message_id, stream):
+        if stream["error"]:
+            return {"type": "error", "message_id": message_id, "message": stream["error"]}
+        frame = {"type": "assistant_response_end", "message_id": message_id}
+        if stream["cancelled"]:
+            frame["cancelled"] = True
+        return frame
+
+    async def _fan_out(self, stream, frame):
+        # Frames are handed to every socket before awaiting, which keeps
+        # them in order while still applying backpressure from the writes
+        pending = [send(frame) for send in list(stream["subscribers"])]
+        await asyncio.gather(*[p for p in pending if p is not None], return_exceptions=True)
+
+    def _purge(self):
+        """Drop finished streams older than the TTL."""
+        now = time.monotonic()
+        expired = [
+            message_id for message_id, stream in self._streams.items()
+            if stream["finished_at"] is not None and now - stream["finished_at"] > self.ttl
+        ]
+        for message_id in expired:
+            del self._streams[message_id]
+
+    def _make_room(self):
+        """
+        Evict the oldest finished streams until one more can be buffered.
+
+        Returns:
+            bool: False if every buffered stream is still generating.
+        """
+        buffered = [message_id for message_id, stream in self._streams.items() if stream["resumable"]]
+        finished = [message_id for message_id in buffered if self._streams[message_id]["finished_at"] is not None]
+        excess = len(buffered) - self.max_streams + 1
+        if excess > len(finished):
+            return False
+        for message_id in finished[:max(excess, 0)]:
+            del self._streams[message_id]
+            logger.debug(f"Evicted stream {message_id} from replay buffer")
+        return True
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+from services.context_service import split_history
+from services.llm_service import ROLE_LABELS
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new turns into the current summary, keeping the facts, decisions, user "
+    "preferences and open questions needed to continue the conversation. "
+    "Reply with the updated summary only."
+)
+
+class ConversationSummarizer:
+    """
+    Compacts older turns of long conversations into a stored summary.
+
+    Runs in the background after a response finishes. Once the turns not
+    covered by the latest summary exceed `trigger_tokens`, all but the
+    `keep_recent` newest of them are merged into the summary by the LLM.
+    The new summary is persisted as a 'system' message, so a reloaded
+    history is split the same way as the cached one.
+    """
+
+    def __init__(self, cache, llm_service, persistence_queue, trigger_tokens,
+                 keep_recent, max_tokens):
+        """
+        Args:
+            cache (ConversationHistoryCache): Shared history cache.
+            llm_service (LLMService): Used to write the summaries.
+            persistence_queue (PersistenceQueue): Stores new summaries.
+            trigger_tokens (int): Uncovered history tokens that trigger an update.
+            keep_recent (int): Newest messages always left out of the summary.
+            max_tokens (int): Length limit of a summary.
+        """
+        self.cache = cache
+        self.llm_service = llm_service
+        self.persistence_queue = persistence_queue
+        self.trigger_tokens = trigger_tokens
+        self.keep_recent = keep_recent
+        self.max_tokens = max_tokens
+        self._tasks = {}
+
+    def maybe_summarize(self, conversation_id, user_id):
+        """Start a summary update for the conversation if it has grown past the threshold."""
+        if conversation_id in self._tasks:
+            return
+        history = self.cache.get(conversation_id)
+        if not history:
+            return
+
+        summary, uncovered = split_history(history, self.keep_recent)
+        cut = len(uncovered) - self.keep_recent
+        if cut <= 0 or sum(m["tokens"] for m in uncovered) < self.trigger_tokens:
+            return
+
+        task = asyncio.ensure_future(self._summarize(
+            conversation_id, user_id, history, summary, uncovered[:cut], uncovered[cut:]))
+        self._tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(conversation_id, None))
+
+    def _build_request(self, summary, turns):
+        transcript = "\n\n".join(
+            f"{ROLE_LABELS.get(m['role'], 'User')}: {m['content']}"
+            for m in turns if m["role"] != "system"
+        )
+        messages = [{"role": "system", "content": SUMMARY_INSTRUCTIONS}]
+        if summary is not None:
+            messages.append({"role": "system", "content": f"Current summary:\n{summary['content']}"})
+        messages.append({"role": "user", "content": f"New conversation turns:\n\n{transcript}"})
+        return messages
+
+    async def _summarize(self, conversation_id, user_id, history, summary, turns, recent):
+        try:
+            text = await self.llm_service.complete(
+                self._build_request(summary, turns), user_id, self.max_tokens)
+        except Exception as e:
+            logger.warning(f"Could not summarize conversation {conversation_id}: {e}")
+            metrics.SUMMARIES.inc(labels=("error",))
+            return
+
+        text = text.strip()
+        if not text:
+            metrics.SUMMARIES.inc(labels=("error",))
+            return
+
+        # The summary must directly follow the turns it was written from;
+        # if the thread moved on meanwhile, the next response retries
+        current = self.cache.get(conversation_id)
+        if not current or current[-1] is not history[-1]:
+            metrics.SUMMARIES.inc(labels=("stale",))
+            return
+
+        # Update the cache and stamp the stored message before yielding to
+        # the event loop, so no new turn can land between them
+        self.cache.set(conversation_id, recent + [{"role": "system", "content": text}])
+        try:
+            await self.persistence_queue.enqueue(conversation_id, "system", text, user_id=user_id)
+        except RuntimeError as e:
+            logger.warning(f"Could not store summary of conversation {conversation_id}: {e}")
+            metrics.SUMMARIES.inc(labels=("error",))
+            return
+        metrics.SUMMARIES.inc(labels=("updated",))
+        logger.info(f"Summarized {len(turns)} messages of conversation {conversation_id}")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import modules the way main.py does: relative to the server root,
+# with backend/ on the path for the shared code
+SERVER_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [SERVER_ROOT, os.path.join(SERVER_ROOT, "..")]
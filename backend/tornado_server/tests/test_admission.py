@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from services.admission import AdmissionController, AdmissionRejected
+
+class AdmissionControllerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_admits_up_to_the_limit_then_queues(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=1)
+        holder = controller.admit("a")
+        await holder.__aenter__()
+
+        waiter = asyncio.ensure_future(controller.admit("b").__aenter__())
+        await asyncio.sleep(0)
+        self.assertEqual((controller.active, controller.queued), (1, 1))
+
+        await holder.__aexit__(None, None, None)
+        await waiter
+        self.assertEqual((controller.active, controller.queued), (1, 0))
+
+    async def test_sheds_when_the_queue_is_full(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1)
+        async with controller.admit("a"):
+            with self.assertRaises(AdmissionRejected):
+                async with controller.admit("b"):
+                    pass
+
+    async def test_waiter_cancelled_in_the_same_tick_as_a_release(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=1)
+        holder = controller.admit("a")
+        await holder.__aenter__()
+
+        admission = controller.admit("b")
+        waiter = asyncio.ensure_future(admission.__aenter__())
+        await asyncio.sleep(0)
+        self.assertEqual(controller.queued, 1)
+
+        waiter.cancel()
+        await holder.__aexit__(None, None, None)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        else:
+            # Admitted before the cancellation landed; give the slot back
+            await admission.__aexit__(None, None, None)
+
+        self.assertEqual((controller.active, controller.queued), (0, 0))
+        async with controller.admit("c"):
+            self.assertEqual(controller.active, 1)
+
+    async def test_waiter_future_done_before_dispatch_is_skipped(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=1)
+        holder = controller.admit("a")
+        await holder.__aenter__()
+
+        cancelled = asyncio.ensure_future(controller.admit("b").__aenter__())
+        queued = asyncio.ensure_future(controller.admit("c").__aenter__())
+        await asyncio.sleep(0)
+        self.assertEqual(controller.queued, 2)
+
+        # The waiter gave up but its cleanup has not run yet when the slot frees
+        for _, _, waiter in controller._waiting:
+            if waiter["user_id"] == "b":
+                waiter["future"].cancel()
+        await holder.__aexit__(None, None, None)
+
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+        await queued
+        self.assertEqual((controller.active, controller.queued), (1, 0))
@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+
+from services.llm_cache import LLMResponseCache
+
+def upstream(tokens, stall_after=None, calls=None):
+    """Return a produce callable streaming `tokens`, hanging after `stall_after` of them."""
+    async def produce():
+        if calls is not None:
+            calls.append(1)
+        for index, token in enumerate(tokens):
+            if index == stall_after:
+                await asyncio.sleep(60)
+            await asyncio.sleep(0)
+            yield token
+    return produce
+
+async def collect(stream):
+    return [token async for token in stream]
+
+class LLMResponseCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_identical_deterministic_requests_share_one_call(self):
+        cache = LLMResponseCache(ttl=0, max_entries=10, max_bytes=1024)
+        calls = []
+        produce = upstream(["Hello", " world"], calls=calls)
+
+        results = await asyncio.gather(
+            collect(cache.stream("key", produce)), collect(cache.stream("key", produce)))
+
+        self.assertEqual(results, [["Hello", " world"]] * 2)
+        self.assertEqual(len(calls), 1)
+
+    async def test_sampled_requests_make_their_own_calls(self):
+        cache = LLMResponseCache(ttl=60, max_entries=10, max_bytes=1024)
+        calls = []
+        produce = upstream(["Hello"], calls=calls)
+
+        await asyncio.gather(
+            collect(cache.stream("key", produce, 0.7)), collect(cache.stream("key", produce, 0.7)))
+
+        self.assertEqual(len(calls), 2)
+
+    async def test_follower_falls_back_when_nothing_was_sent(self):
+        cache = LLMResponseCache(ttl=0, max_entries=10, max_bytes=1024, follow_timeout=0.05)
+        leader = asyncio.ensure_future(collect(cache.stream("key", upstream(["Hi"], stall_after=0))))
+        await asyncio.sleep(0)
+
+        follower = await collect(cache.stream("key", upstream(["Hello", " friend"])))
+
+        self.assertEqual(follower, ["Hello", " friend"])
+        leader.cancel()
+
+    async def test_follower_fails_instead_of_splicing_a_new_reply(self):
+        cache = LLMResponseCache(ttl=0, max_entries=10, max_bytes=1024, follow_timeout=0.05)
+        leader = asyncio.ensure_future(
+            collect(cache.stream("key", upstream(["Hello", " world"], stall_after=1))))
+        await asyncio.sleep(0.01)
+
+        received = []
+        with self.assertRaises(Exception):
+            async for token in cache.stream("key", upstream(["Howdy", " friend"])):
+                received.append(token)
+
+        self.assertEqual(received, ["Hello"])
+        leader.cancel()
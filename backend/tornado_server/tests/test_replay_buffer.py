@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from services.replay_buffer import StreamReplayBuffer
+
+class StreamReplayBufferTest(unittest.IsolatedAsyncioTestCase):
+
+    def subscriber(self, buffer, message_id):
+        frames = []
+        buffer.subscribe(message_id, frames.append)
+        return frames
+
+    async def test_live_streams_are_delivered_past_the_limit(self):
+        buffer = StreamReplayBuffer(max_streams=2, ttl=60)
+        received = {}
+        for message_id in ("a", "b", "c"):
+            buffer.start(message_id, "user", "conversation")
+            received[message_id] = self.subscriber(buffer, message_id)
+
+        for message_id in ("a", "b", "c"):
+            await buffer.append(message_id, "hello")
+            await buffer.finish(message_id)
+
+        for message_id, frames in received.items():
+            self.assertEqual(
+                [frame["type"] for frame in frames],
+                ["assistant_response_chunk", "assistant_response_end"], message_id)
+
+    async def test_streams_past_the_limit_are_not_resumable(self):
+        buffer = StreamReplayBuffer(max_streams=2, ttl=60)
+        for message_id in ("a", "b", "c"):
+            buffer.start(message_id, "user", "conversation")
+
+        self.assertIsNotNone(buffer.get("a", "user"))
+        self.assertIsNotNone(buffer.get("b", "user"))
+        self.assertIsNone(buffer.get("c", "user"))
+
+    async def test_finished_streams_are_evicted_first(self):
+        buffer = StreamReplayBuffer(max_streams=2, ttl=60)
+        buffer.start("a", "user", "conversation")
+        buffer.start("b", "user", "conversation")
+        await buffer.finish("a")
+
+        buffer.start("c", "user", "conversation")
+        self.assertIsNone(buffer.get("a", "user"))
+        self.assertIsNotNone(buffer.get("b", "user"))
+        self.assertIsNotNone(buffer.get("c", "user"))
+
+    async def test_replay_from_offset(self):
+        buffer = StreamReplayBuffer(max_streams=2, ttl=60)
+        buffer.start("a", "user", "conversation")
+        for chunk in ("one", "two", "three"):
+            await buffer.append("a", chunk)
+
+        frames = []
+        await buffer.replay("a", 1, frames.append)
+        await buffer.finish("a")
+        self.assertEqual(
+            [frame.get("chunk") for frame in frames], ["two", "three", None])
+        self.assertEqual(frames[-1]["type"], "assistant_response_end")
+
+    async def test_cancel_stops_the_generating_task_of_the_owner(self):
+        buffer = StreamReplayBuffer(max_streams=2, ttl=60)
+        generation = asyncio.ensure_future(asyncio.sleep(60))
+        buffer.start("a", "user", "conversation", generation)
+
+        self.assertFalse(buffer.cancel("a", "someone-else"))
+        self.assertFalse(buffer.cancel("missing", "user"))
+        self.assertTrue(buffer.cancel("a", "user"))
+        with self.assertRaises(asyncio.CancelledError):
+            await generation
+
+    async def test_cancel_after_finish_does_nothing(self):
+        buffer = StreamReplayBuffer(max_streams=2, ttl=60)
+        generation = asyncio.ensure_future(asyncio.sleep(60))
+        buffer.start("a", "user", "conversation", generation)
+        await buffer.finish("a")
+
+        self.assertFalse(buffer.cancel("a", "user"))
+        self.assertFalse(generation.cancelled())
+        generation.cancel()
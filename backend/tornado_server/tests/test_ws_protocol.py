@@ -0,0 +1,40 @@
+import unittest
+
+from utils import ws_protocol
+from utils.ws_protocol import FrameDecodeError, JSONFrameCodec, MsgpackFrameCodec
+
+class JSONFrameCodecTest(unittest.TestCase):
+
+    def test_decodes_an_object(self):
+        self.assertEqual(JSONFrameCodec().decode('{"type": "ping"}'), {"type": "ping"})
+
+    def test_rejects_invalid_json(self):
+        with self.assertRaises(FrameDecodeError):
+            JSONFrameCodec().decode("{not json")
+
+    def test_rejects_non_objects(self):
+        with self.assertRaises(FrameDecodeError):
+            JSONFrameCodec().decode("[1, 2]")
+
+@unittest.skipIf(ws_protocol.msgpack is None, "msgpack is not installed")
+class MsgpackFrameCodecTest(unittest.TestCase):
+
+    def test_decodes_a_map(self):
+        message = ws_protocol.msgpack.packb({"type": "ping"})
+        self.assertEqual(MsgpackFrameCodec().decode(message), {"type": "ping"})
+
+    def test_rejects_trailing_data(self):
+        message = ws_protocol.msgpack.packb({"type": "ping"}) + b"\x01"
+        with self.assertRaises(FrameDecodeError):
+            MsgpackFrameCodec().decode(message)
+
+    def test_rejects_malformed_data(self):
+        with self.assertRaises(FrameDecodeError):
+            MsgpackFrameCodec().decode(b"\xc1")
+
+    def test_rejects_non_maps(self):
+        with self.assertRaises(FrameDecodeError):
+            MsgpackFrameCodec().decode(ws_protocol.msgpack.packb([1, 2]))
+
+    def test_accepts_json_text_frames(self):
+        self.assertEqual(MsgpackFrameCodec().decode('{"type": "ping"}'), {"type": "ping"})
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ChunkCoalescer:
+    """
+    Buffer streamed tokens and flush them as larger chunks.
+
+    A flush happens when the buffered text reaches `max_bytes`, or when
+    `flush_interval` seconds have passed since the first buffered token.
+    With `flush_first` enabled the very first token is sent immediately
+    to keep time-to-first-token low.
+    """
+
+    def __init__(self, send, flush_interval=0.05, max_bytes=1024, flush_first=True):
+        """
+        Args:
+            send (coroutine function): Called with the coalesced text.
+            flush_interval (float): Maximum time in seconds a token is held.
+            max_bytes (int): Flush once the buffer holds this many bytes.
+            flush_first (bool): Send the first token without buffering.
+        """
+        self.send = send
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.flush_first = flush_first
+        self.frames_sent = 0
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._timer = None
+        self._pending = None
+
+    async def add(self, token):
+        """Add a token to the buffer, flushing if a threshold is reached."""
+        self._check_pending()
+        self._buffer.append(token)
+        self._buffered_bytes += len(token.encode("utf-8"))
+
+        if self.flush_first and self.frames_sent == 0:
+            await self.flush()
+        elif self._buffered_bytes >= self.max_bytes:
+            await self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._on_timer)
+
+    def _on_timer(self):
+        """Flush buffered tokens once the time window has elapsed."""
+        self._timer = None
+        self._pending = asyncio.ensure_future(self._timed_flush(self._pending))
+
+    async def _timed_flush(self, previous):
+        """Send the buffer after any earlier timed flush has finished."""
+        if previous is not None:
+            await previous
+        await self._send_buffered()
+
+    def _check_pending(self):
+        """Re-raise the error of a finished timed flush in the caller."""
+        pending = self._pending
+        if pending is not None and pending.done():
+            self._pending = None
+            if not pending.cancelled() and pending.exception() is not None:
+                raise pending.exception()
+
+    async def flush(self):
+        """Send everything currently buffered as a single chunk."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._pending is not None:
+            # Let a timed flush finish first so chunks keep their order
+            await asyncio.wait([self._pending])
+            self._check_pending()
+
+        await self._send_buffered()
+
+    async def _send_buffered(self):
+        """Send and clear the buffer."""
+        if not self._buffer:
+            return
+
+        # Swap the buffer before awaiting so chunks keep their order
+        chunk = "".join(self._buffer)
+        self._buffer = []
+        self._buffered_bytes = 0
+        self.frames_sent += 1
+        await self.send(chunk)
+
+    def cancel(self):
+        """Drop any pending timer without sending buffered tokens."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # A timed flush already under way finishes; only its failure is reported
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.add_done_callback(_log_failed_flush)
+
+def _log_failed_flush(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Timed flush failed: {task.exception()}")
@@ -0,0 +1,30 @@
+import json
+import logging
+from config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj).decode("utf-8")
+
+def _select_backend(name):
+    """Pick the codec backend; "auto" prefers orjson when it is installed."""
+    if name == "orjson" or (name == "auto" and orjson is not None):
+        if orjson is None:
+            logger.warning("JSON_CODEC=orjson but orjson is not installed, using json")
+        else:
+            return "orjson", _orjson_dumps, orjson.loads
+    return "json", _stdlib_dumps, json.loads
+
+# dumps(obj) -> str and loads(str | bytes) -> obj; both raise ValueError
+# subclasses (json.JSONDecodeError for loads) on bad input.
+BACKEND, dumps, loads = _select_backend(config.JSON_CODEC)
@@ -0,0 +1,22 @@
+from shared.metrics import LATENCY_BUCKETS, MetricsRegistry
+
+RATE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REGISTRY = MetricsRegistry()
+
+WEBSOCKET_CONNECTIONS = REGISTRY.gauge(
+    "chat_websocket_connections", "Open WebSocket connections in this worker")
+TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "chat_time_to_first_token_seconds", "Time from receiving a prompt to streaming its first token")
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "chat_tokens_per_second", "Streaming rate of each response after its first token", RATE_BUCKETS)
+RESPONSES = REGISTRY.counter(
+    "chat_responses_total", "Finished assistant responses by outcome", ("outcome",))
+SUMMARIES = REGISTRY.counter(
+    "chat_summaries_total", "Conversation summary updates by outcome", ("outcome",))
+LLM_UPSTREAM_LATENCY = REGISTRY.histogram(
+    "llm_upstream_request_seconds", "Duration of upstream LLM streaming requests")
+LLM_UPSTREAM_ERRORS = REGISTRY.counter(
+    "llm_upstream_errors_total", "Failed upstream LLM requests")
+PERSISTENCE_LATENCY = REGISTRY.histogram(
+    "persistence_batch_seconds", "Latency of message batch writes to the message store")
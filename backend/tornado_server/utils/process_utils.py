@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import errno
+import signal
+import logging
+
+logger = logging.getLogger(__name__)
+
+def supervise_workers(num_workers, max_restarts):
+    """
+    Fork `num_workers` worker processes and supervise them.
+
+    Returns the worker id (0 to num_workers - 1) in each child. The parent
+    never returns: it restarts workers that exit abnormally, forwards
+    SIGTERM/SIGINT/SIGHUP to the workers for a graceful shutdown and exits
+    once they are all gone.
+
+    Args:
+        num_workers (int): Number of worker processes.
+        max_restarts (int): Restarts allowed before the supervisor gives up.
+    """
+    children = {}
+    shutting_down = False
+
+    def start_child(worker_id):
+        pid = os.fork()
+        if pid == 0:
+            # Child: restore default signal handling before the IOLoop starts
+            for s in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(s, signal.SIG_DFL)
+            return worker_id
+        children[pid] = worker_id
+        return None
+
+    def forward(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        logger.info(f"Supervisor forwarding signal {signum} to {len(children)} workers")
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    for worker_id in range(num_workers):
+        if start_child(worker_id) is not None:
+            return worker_id
+
+    for s in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(s, forward)
+    logger.info(f"Supervisor {os.getpid()} started {num_workers} workers")
+
+    restarts = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            raise
+        worker_id = children.pop(pid, None)
+        if worker_id is None:
+            continue
+
+        exit_code = os.waitstatus_to_exitcode(status)
+        if shutting_down or exit_code == 0:
+            logger.info(f"Worker {worker_id} (pid {pid}) exited with code {exit_code}")
+            continue
+
+        logger.warning(f"Worker {worker_id} (pid {pid}) died with code {exit_code}, restarting")
+        restarts += 1
+        if restarts > max_restarts:
+            logger.error("Too many worker restarts, shutting down")
+            forward(signal.SIGTERM, None)
+            continue
+
+        # Avoid a tight crash loop
+        time.sleep(1)
+        if start_child(worker_id) is not None:
+            return worker_id
+
+    sys.exit(0)
@@ -0,0 +1,111 @@
+class SSEEvent:
+    """A dispatched server-sent event. `data` is kept as raw UTF-8 bytes."""
+
+    __slots__ = ("event", "data", "id", "retry")
+
+    def __init__(self, event, data, id, retry):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, data={self.data!r}, id={self.id!r}, retry={self.retry!r})"
+
+class SSEParser:
+    """
+    Incremental parser for text/event-stream bodies.
+
+    Raw byte chunks are fed in as they arrive from the network, in any
+    split; only an unterminated trailing line is carried between chunks.
+    Events are dispatched on blank lines as described in the HTML spec:
+    multi-line data, comments, and the event/id/retry fields are handled.
+    Data is never decoded to str, so it can go straight to a JSON decoder.
+    """
+
+    def __init__(self):
+        self._pending = b""
+        self._skip_lf = False
+        self._data = []
+        self._event = None
+        self.last_event_id = None
+        self.retry = None
+
+    def feed(self, chunk):
+        """Parse a chunk of bytes and return the list of events it completed."""
+        # A CR ending the previous chunk may be followed by its LF here
+        if self._skip_lf and chunk:
+            self._skip_lf = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+
+        buffer = self._pending + chunk if self._pending else chunk
+        if b"\r" in buffer:
+            # Rare CR and CRLF line endings are normalized to LF
+            self._skip_lf = buffer.endswith(b"\r")
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+        lines = buffer.split(b"\n")
+        # Only the unterminated tail is carried over to the next chunk
+        self._pending = lines.pop()
+
+        events = []
+        data = self._data
+        for line in lines:
+            if not line:
+                event = self._dispatch()
+                if event is not None:
+                    events.append(event)
+                data = self._data
+            elif line.startswith(b"data:"):
+                value = line[5:]
+                data.append(value[1:] if value[:1] == b" " else value)
+            elif line[0] != 0x3A:
+                # Anything but a comment line
+                self._process_field(line)
+        return events
+
+    def _process_field(self, line):
+        field, sep, value = line.partition(b":")
+        if sep and value[:1] == b" ":
+            value = value[1:]
+
+        if field == b"data":
+            self._data.append(value)
+        elif field == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif field == b"id":
+            if b"\x00" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
+
+    def _dispatch(self):
+        if not self._data:
+            self._event = None
+            return None
+        data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+        event = SSEEvent(self._event or "message", data, self.last_event_id, self.retry)
+        self._data = []
+        self._event = None
+        return event
+
+def extract_token(payload):
+    """
+    Return the generated text of a streamed completion payload.
+
+    Handles both completion style `choices[0].text` and chat style
+    `choices[0].delta.content` payloads.
+    """
+    choices = payload.get("choices")
+    if not choices:
+        return ""
+    choice = choices[0]
+    text = choice.get("text")
+    if text is not None:
+        return text
+    delta = choice.get("delta")
+    if delta:
+        return delta.get("content") or ""
+    return ""
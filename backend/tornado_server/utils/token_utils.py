@@ -0,0 +1,28 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    # tiktoken is optional; fall back to a character based estimate
+    _encoding = None
+
+# Rough number of characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Tokens spent on the role prefix and separators of each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in `text` without calling the LLM provider."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def estimate_message_tokens(content):
+    """Estimate the tokens a single chat message takes in the prompt."""
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,124 @@
+import logging
+
+from utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_SUBPROTOCOL = "chat.json.v1"
+MSGPACK_SUBPROTOCOL = "chat.msgpack.v1"
+
+# Integer codes replacing the "type" string of server frames in binary mode
+TYPE_CODES = {
+    "error": 0,
+    "auth_success": 1,
+    "conversation_created": 2,
+    "conversation_selected": 3,
+    "assistant_response_start": 4,
+    "assistant_response_chunk": 5,
+    "assistant_response_end": 6,
+    "assistant_response_resumed": 7,
+    "queued": 8,
+    "pong": 9,
+}
+
+CHUNK_CODE = TYPE_CODES["assistant_response_chunk"]
+FINAL_TYPES = ("assistant_response_end", "error")
+
+class FrameDecodeError(ValueError):
+    """Raised by a frame codec when a client message cannot be decoded."""
+
+def _json_message(message):
+    try:
+        data = json_codec.loads(message)
+    except ValueError as e:
+        raise FrameDecodeError("Invalid JSON message") from e
+    if not isinstance(data, dict):
+        raise FrameDecodeError("Invalid JSON message")
+    return data
+
+class JSONFrameCodec:
+    """Default text framing: one JSON object per WebSocket message."""
+
+    binary = False
+
+    def encode(self, frame):
+        return json_codec.dumps(frame)
+
+    def decode(self, message):
+        return _json_message(message)
+
+class MsgpackFrameCodec:
+    """
+    Compact binary framing using MessagePack.
+
+    Server frames are arrays `[type_code, stream_id, fields]`, where
+    `fields` holds the remaining keys of the JSON frame. A response's
+    `message_id` is replaced by a small per-connection stream id; the first
+    frame of a stream still carries the full `message_id` so the client can
+    map the two. Chunk frames, the bulk of the traffic, are flattened to
+    `[5, stream_id, index, chunk]`.
+
+    Client messages are MessagePack maps with the same keys as the JSON
+    protocol; text frames are still accepted as JSON.
+    """
+
+    binary = True
+
+    def __init__(self):
+        self._streams = {}
+        self._next_stream = 0
+
+    def _stream_id(self, message_id, fields):
+        stream_id = self._streams.get(message_id)
+        if stream_id is None:
+            stream_id = self._next_stream
+            self._next_stream += 1
+            self._streams[message_id] = stream_id
+            fields["message_id"] = message_id
+        return stream_id
+
+    def encode(self, frame):
+        frame_type = frame["type"]
+        message_id = frame.get("message_id")
+        fields = {k: v for k, v in frame.items() if k not in ("type", "message_id")}
+
+        stream_id = None
+        if message_id is not None:
+            stream_id = self._stream_id(message_id, fields)
+            if frame_type in FINAL_TYPES:
+                del self._streams[message_id]
+
+        if frame_type == "assistant_response_chunk" and "message_id" not in fields:
+            return msgpack.packb([CHUNK_CODE, stream_id, frame["index"], frame["chunk"]])
+
+        return msgpack.packb([TYPE_CODES.get(frame_type, frame_type), stream_id, fields])
+
+    def decode(self, message):
+        if isinstance(message, str):
+            return _json_message(message)
+        try:
+            data = msgpack.unpackb(message)
+        except (ValueError, TypeError, msgpack.UnpackException) as e:
+            # ExtraData, FormatError and friends
+            raise FrameDecodeError("Invalid MessagePack message") from e
+        if not isinstance(data, dict):
+            raise FrameDecodeError("Invalid MessagePack message")
+        return data
+
+def select_subprotocol(subprotocols):
+    """Pick the framing for the subprotocols a client offered; None keeps plain JSON."""
+    if MSGPACK_SUBPROTOCOL in subprotocols and msgpack is not None:
+        return MSGPACK_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in subprotocols:
+        return JSON_SUBPROTOCOL
+    return None
+
+def make_frame_codec(subprotocol):
+    if subprotocol == MSGPACK_SUBPROTOCOL:
+        return MsgpackFrameCodec()
+    return JSONFrameCodec()
@@ -16,16 +16,37 @@ CREATE TABLE IF NOT EXISTS conversations (
     user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     title VARCHAR(255) NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    archived_at TIMESTAMP WITH TIME ZONE,
+    rehydrated_at TIMESTAMP WITH TIME ZONE,
+    deleted_at TIMESTAMP WITH TIME ZONE
 );
 
+-- Messages are range-partitioned by month; the partition key must be part
+-- of the primary key, so the key alone does not make ids unique and writers
+-- skip ids that are already stored before inserting
 CREATE TABLE IF NOT EXISTS messages (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
     role VARCHAR(50) NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
     content TEXT NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside every monthly partition so inserts never fail
+CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT;
+
+-- One row per archived conversation; the messages are a single lz4-compressed
+-- value instead of one heap row and index entry per message
+CREATE TABLE IF NOT EXISTS conversation_archives (
+    conversation_id UUID PRIMARY KEY REFERENCES conversations(id) ON DELETE CASCADE,
+    message_count INTEGER NOT NULL,
+    messages JSONB NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
+ALTER TABLE conversation_archives ALTER COLUMN messages SET COMPRESSION lz4;
 
 CREATE TABLE IF NOT EXISTS user_preferences (
     user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
@@ -35,5 +56,171 @@ CREATE TABLE IF NOT EXISTS user_preferences (
 );
 
 -- Create indexes
-CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
-CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_conversations_user_updated ON conversations(user_id, updated_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created ON messages(conversation_id, created_at, id); 
+CREATE INDEX IF NOT EXISTS idx_messages_content_tsv ON messages USING GIN (content_tsv);
+CREATE INDEX IF NOT EXISTS idx_conversations_deleted ON conversations(deleted_at) WHERE deleted_at IS NOT NULL;
+
+-- Partition management
+-- Create the monthly partition containing `month_start`, if it does not exist yet.
+-- Rows for that month already in messages_default, left there when partition
+-- maintenance fell behind, are moved into the new partition.
+CREATE OR REPLACE FUNCTION create_message_partition(month_start TIMESTAMPTZ)
+RETURNS BOOLEAN AS $$
+DECLARE
+    lower_bound TIMESTAMPTZ := date_trunc('month', month_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    upper_bound TIMESTAMPTZ := lower_bound + INTERVAL '1 month';
+    partition_name TEXT := 'messages_p' || to_char(lower_bound AT TIME ZONE 'UTC', 'YYYYMM');
+    moved INTEGER;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM messages_default WHERE created_at >= lower_bound AND created_at < upper_bound
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+            partition_name, lower_bound, upper_bound);
+        RETURN TRUE;
+    END IF;
+
+    -- Postgres refuses a partition whose rows sit in the default partition:
+    -- build it standalone, move the rows over and attach it. Locking the
+    -- parent first keeps the lock order of concurrent inserts.
+    LOCK TABLE messages IN SHARE UPDATE EXCLUSIVE MODE;
+    LOCK TABLE messages_default IN EXCLUSIVE MODE;
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)',
+        partition_name);
+    EXECUTE format(
+        'WITH moved AS ('
+        '    DELETE FROM messages_default WHERE created_at >= %L AND created_at < %L'
+        '    RETURNING id, conversation_id, role, content, created_at'
+        ') INSERT INTO %I (id, conversation_id, role, content, created_at) SELECT * FROM moved',
+        lower_bound, upper_bound, partition_name);
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    EXECUTE format(
+        'ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, upper_bound);
+    RAISE NOTICE 'Moved % rows from messages_default into %', moved, partition_name;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist from `since` through `months_ahead` months from now.
+-- By default this starts at the oldest month with rows in messages_default.
+CREATE OR REPLACE FUNCTION create_message_partitions(
+    months_ahead INTEGER DEFAULT 3, since TIMESTAMPTZ DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start TIMESTAMPTZ := COALESCE(
+        since, LEAST(NOW(), (SELECT MIN(created_at) FROM messages_default)));
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start < NOW() + make_interval(months => months_ahead + 1) LOOP
+        IF create_message_partition(month_start) THEN
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_message_partitions(3);
+
+-- Cold-conversation archival
+-- Move a conversation's messages into the archive
+CREATE OR REPLACE FUNCTION archive_conversation(conv UUID)
+RETURNS INTEGER AS $$
+DECLARE
+    archived INTEGER;
+BEGIN
+    -- Merge with an existing archive row in case messages arrived since
+    INSERT INTO conversation_archives (conversation_id, message_count, messages)
+    SELECT conv, COUNT(*), COALESCE(jsonb_agg(jsonb_build_object(
+        'id', m.id, 'role', m.role, 'content', m.content, 'created_at', m.created_at)
+        ORDER BY m.created_at, m.id), '[]'::jsonb)
+    FROM (
+        SELECT id, role, content, created_at FROM messages WHERE conversation_id = conv
+        UNION
+        SELECT r.id, r.role, r.content, r.created_at
+        FROM conversation_archives a,
+             jsonb_to_recordset(a.messages) AS r(id UUID, role TEXT, content TEXT, created_at TIMESTAMPTZ)
+        WHERE a.conversation_id = conv
+    ) m
+    ON CONFLICT (conversation_id) DO UPDATE
+        SET message_count = EXCLUDED.message_count,
+            messages = EXCLUDED.messages,
+            archived_at = NOW()
+    RETURNING message_count INTO archived;
+
+    DELETE FROM messages WHERE conversation_id = conv;
+    UPDATE conversations SET archived_at = NOW() WHERE id = conv;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Archive up to `batch_size` conversations without activity for `inactive_days`
+CREATE OR REPLACE FUNCTION archive_inactive_conversations(
+    inactive_days INTEGER, batch_size INTEGER DEFAULT 100)
+RETURNS INTEGER AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := NOW() - make_interval(days => inactive_days);
+    conv UUID;
+    archived INTEGER := 0;
+BEGIN
+    FOR conv IN
+        SELECT id FROM conversations
+        WHERE archived_at IS NULL
+          AND deleted_at IS NULL
+          AND updated_at < cutoff
+          AND (rehydrated_at IS NULL OR rehydrated_at < cutoff)
+        ORDER BY updated_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    LOOP
+        PERFORM archive_conversation(conv);
+        archived := archived + 1;
+    END LOOP;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move an archived conversation's messages back into the messages table
+CREATE OR REPLACE FUNCTION rehydrate_conversation(conv UUID)
+RETURNS INTEGER AS $$
+DECLARE
+    restored INTEGER := 0;
+BEGIN
+    -- Serializes concurrent rehydrations of the same conversation
+    PERFORM 1 FROM conversation_archives WHERE conversation_id = conv FOR UPDATE;
+    IF FOUND THEN
+        INSERT INTO messages (id, conversation_id, role, content, created_at)
+        SELECT r.id, conv, r.role, r.content, r.created_at
+        FROM conversation_archives a,
+             jsonb_to_recordset(a.messages) AS r(id UUID, role TEXT, content TEXT, created_at TIMESTAMPTZ)
+        WHERE a.conversation_id = conv
+        ON CONFLICT (id, created_at) DO NOTHING;
+        GET DIAGNOSTICS restored = ROW_COUNT;
+        DELETE FROM conversation_archives WHERE conversation_id = conv;
+    END IF;
+    UPDATE conversations SET archived_at = NULL, rehydrated_at = NOW() WHERE id = conv;
+    RETURN restored;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Scheduled maintenance, when pg_cron is installed; otherwise run
+-- `flask maintenance` from cron (see the deployment guide)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('create-message-partitions', '0 3 * * *',
+            'SELECT create_message_partitions(3)');
+        PERFORM cron.schedule('archive-inactive-conversations', '30 3 * * *',
+            'SELECT archive_inactive_conversations(90, 1000)');
+    END IF;
+END;
+$$;
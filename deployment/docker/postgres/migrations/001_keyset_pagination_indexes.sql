@@ -0,0 +1,14 @@
+-- Composite indexes backing keyset pagination of conversations and messages.
+-- Run outside a transaction block: CREATE INDEX CONCURRENTLY does not lock writes.
+
+-- Conversation list: WHERE user_id = ? ORDER BY updated_at DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_user_updated
+    ON conversations(user_id, updated_at DESC, id DESC);
+
+-- Conversation detail: WHERE conversation_id = ? ORDER BY created_at, id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_conversation_created
+    ON messages(conversation_id, created_at, id);
+
+-- Both single-column indexes are prefixes of the composite ones above
+DROP INDEX CONCURRENTLY IF EXISTS idx_conversations_user_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_messages_conversation_id;
@@ -0,0 +1,188 @@
+-- Range-partition messages by month of created_at and add cold-conversation archival.
+-- Rewrites the messages table in one transaction: run it in a maintenance window.
+
+BEGIN;
+
+-- Partition management --------------------------------------------------------
+
+-- Create the monthly partition containing `month_start`, if it does not exist yet
+CREATE OR REPLACE FUNCTION create_message_partition(month_start TIMESTAMPTZ)
+RETURNS BOOLEAN AS $$
+DECLARE
+    lower_bound TIMESTAMPTZ := date_trunc('month', month_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    upper_bound TIMESTAMPTZ := lower_bound + INTERVAL '1 month';
+    partition_name TEXT := 'messages_p' || to_char(lower_bound AT TIME ZONE 'UTC', 'YYYYMM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, upper_bound);
+    RETURN TRUE;
+EXCEPTION WHEN check_violation THEN
+    -- Rows for this month already landed in the default partition
+    RAISE WARNING 'Cannot create %: matching rows exist in messages_default', partition_name;
+    RETURN FALSE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist from `since` through `months_ahead` months from now
+CREATE OR REPLACE FUNCTION create_message_partitions(
+    months_ahead INTEGER DEFAULT 3, since TIMESTAMPTZ DEFAULT NOW())
+RETURNS INTEGER AS $$
+DECLARE
+    month_start TIMESTAMPTZ := since;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start < NOW() + make_interval(months => months_ahead + 1) LOOP
+        IF create_message_partition(month_start) THEN
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitioned messages table ----------------------------------------------------
+
+ALTER TABLE messages RENAME TO messages_unpartitioned;
+ALTER INDEX messages_pkey RENAME TO messages_unpartitioned_pkey;
+ALTER INDEX IF EXISTS idx_messages_conversation_created
+    RENAME TO idx_messages_unpartitioned_conversation_created;
+
+-- The partition key must be part of the primary key, so the key alone does
+-- not make ids unique; writers skip ids that are already stored before inserting
+CREATE TABLE messages (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    role VARCHAR(50) NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
+    content TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside every monthly partition so inserts never fail
+CREATE TABLE messages_default PARTITION OF messages DEFAULT;
+
+SELECT create_message_partitions(
+    3, COALESCE((SELECT MIN(created_at) FROM messages_unpartitioned), NOW()));
+
+INSERT INTO messages (id, conversation_id, role, content, created_at)
+SELECT id, conversation_id, role, content, COALESCE(created_at, NOW())
+FROM messages_unpartitioned;
+
+DROP TABLE messages_unpartitioned;
+
+CREATE INDEX idx_messages_conversation_created ON messages(conversation_id, created_at, id);
+
+-- Cold-conversation archival ----------------------------------------------------
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP WITH TIME ZONE,
+    ADD COLUMN IF NOT EXISTS rehydrated_at TIMESTAMP WITH TIME ZONE;
+
+-- One row per archived conversation; the messages are a single lz4-compressed
+-- value instead of one heap row and index entry per message
+CREATE TABLE IF NOT EXISTS conversation_archives (
+    conversation_id UUID PRIMARY KEY REFERENCES conversations(id) ON DELETE CASCADE,
+    message_count INTEGER NOT NULL,
+    messages JSONB NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+ALTER TABLE conversation_archives ALTER COLUMN messages SET COMPRESSION lz4;
+
+-- Move a conversation's messages into the archive
+CREATE OR REPLACE FUNCTION archive_conversation(conv UUID)
+RETURNS INTEGER AS $$
+DECLARE
+    archived INTEGER;
+BEGIN
+    -- Merge with an existing archive row in case messages arrived since
+    INSERT INTO conversation_archives (conversation_id, message_count, messages)
+    SELECT conv, COUNT(*), COALESCE(jsonb_agg(jsonb_build_object(
+        'id', m.id, 'role', m.role, 'content', m.content, 'created_at', m.created_at)
+        ORDER BY m.created_at, m.id), '[]'::jsonb)
+    FROM (
+        SELECT id, role, content, created_at FROM messages WHERE conversation_id = conv
+        UNION
+        SELECT r.id, r.role, r.content, r.created_at
+        FROM conversation_archives a,
+             jsonb_to_recordset(a.messages) AS r(id UUID, role TEXT, content TEXT, created_at TIMESTAMPTZ)
+        WHERE a.conversation_id = conv
+    ) m
+    ON CONFLICT (conversation_id) DO UPDATE
+        SET message_count = EXCLUDED.message_count,
+            messages = EXCLUDED.messages,
+            archived_at = NOW()
+    RETURNING message_count INTO archived;
+
+    DELETE FROM messages WHERE conversation_id = conv;
+    UPDATE conversations SET archived_at = NOW() WHERE id = conv;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Archive up to `batch_size` conversations without activity for `inactive_days`
+CREATE OR REPLACE FUNCTION archive_inactive_conversations(
+    inactive_days INTEGER, batch_size INTEGER DEFAULT 100)
+RETURNS INTEGER AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := NOW() - make_interval(days => inactive_days);
+    conv UUID;
+    archived INTEGER := 0;
+BEGIN
+    FOR conv IN
+        SELECT id FROM conversations
+        WHERE archived_at IS NULL
+          AND updated_at < cutoff
+          AND (rehydrated_at IS NULL OR rehydrated_at < cutoff)
+        ORDER BY updated_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    LOOP
+        PERFORM archive_conversation(conv);
+        archived := archived + 1;
+    END LOOP;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move an archived conversation's messages back into the messages table
+CREATE OR REPLACE FUNCTION rehydrate_conversation(conv UUID)
+RETURNS INTEGER AS $$
+DECLARE
+    restored INTEGER := 0;
+BEGIN
+    -- Serializes concurrent rehydrations of the same conversation
+    PERFORM 1 FROM conversation_archives WHERE conversation_id = conv FOR UPDATE;
+    IF FOUND THEN
+        INSERT INTO messages (id, conversation_id, role, content, created_at)
+        SELECT r.id, conv, r.role, r.content, r.created_at
+        FROM conversation_archives a,
+             jsonb_to_recordset(a.messages) AS r(id UUID, role TEXT, content TEXT, created_at TIMESTAMPTZ)
+        WHERE a.conversation_id = conv
+        ON CONFLICT (id, created_at) DO NOTHING;
+        GET DIAGNOSTICS restored = ROW_COUNT;
+        DELETE FROM conversation_archives WHERE conversation_id = conv;
+    END IF;
+    UPDATE conversations SET archived_at = NULL, rehydrated_at = NOW() WHERE id = conv;
+    RETURN restored;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Scheduled maintenance, when pg_cron is installed; otherwise run
+-- `flask maintenance` from cron (see the deployment guide)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('create-message-partitions', '0 3 * * *',
+            'SELECT create_message_partitions(3)');
+        PERFORM cron.schedule('archive-inactive-conversations', '30 3 * * *',
+            'SELECT archive_inactive_conversations(90, 1000)');
+    END IF;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- Full-text search over message content.
+-- Adding a stored generated column rewrites every messages partition, and
+-- CREATE INDEX CONCURRENTLY is not supported on partitioned tables: run it
+-- in a maintenance window.
+
+-- Postgres keeps the tsvector up to date on every insert and update
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;
+
+-- Created on every partition, including ones added later
+CREATE INDEX IF NOT EXISTS idx_messages_content_tsv ON messages USING GIN (content_tsv);
@@ -0,0 +1,32 @@
+-- Soft delete for large conversations, purged in chunks by the Flask API.
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+
+-- Lets the purge worker find pending conversations without scanning the table
+CREATE INDEX IF NOT EXISTS idx_conversations_deleted ON conversations(deleted_at) WHERE deleted_at IS NOT NULL;
+
+-- Archive up to `batch_size` conversations without activity for `inactive_days`
+CREATE OR REPLACE FUNCTION archive_inactive_conversations(
+    inactive_days INTEGER, batch_size INTEGER DEFAULT 100)
+RETURNS INTEGER AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := NOW() - make_interval(days => inactive_days);
+    conv UUID;
+    archived INTEGER := 0;
+BEGIN
+    FOR conv IN
+        SELECT id FROM conversations
+        WHERE archived_at IS NULL
+          AND deleted_at IS NULL
+          AND updated_at < cutoff
+          AND (rehydrated_at IS NULL OR rehydrated_at < cutoff)
+        ORDER BY updated_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    LOOP
+        PERFORM archive_conversation(conv);
+        archived := archived + 1;
+    END LOOP;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,89 @@
+-- Move rows stranded in messages_default into their monthly partition instead
+-- of skipping that month, and catch up on months maintenance missed.
+
+BEGIN;
+
+-- Create the monthly partition containing `month_start`, if it does not exist yet.
+-- Rows for that month already in messages_default, left there when partition
+-- maintenance fell behind, are moved into the new partition.
+CREATE OR REPLACE FUNCTION create_message_partition(month_start TIMESTAMPTZ)
+RETURNS BOOLEAN AS $$
+DECLARE
+    lower_bound TIMESTAMPTZ := date_trunc('month', month_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    upper_bound TIMESTAMPTZ := lower_bound + INTERVAL '1 month';
+    partition_name TEXT := 'messages_p' || to_char(lower_bound AT TIME ZONE 'UTC', 'YYYYMM');
+    moved INTEGER;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM messages_default WHERE created_at >= lower_bound AND created_at < upper_bound
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+            partition_name, lower_bound, upper_bound);
+        RETURN TRUE;
+    END IF;
+
+    -- Postgres refuses a partition whose rows sit in the default partition:
+    -- build it standalone, move the rows over and attach it. Locking the
+    -- parent first keeps the lock order of concurrent inserts.
+    LOCK TABLE messages IN SHARE UPDATE EXCLUSIVE MODE;
+    LOCK TABLE messages_default IN EXCLUSIVE MODE;
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)',
+        partition_name);
+    EXECUTE format(
+        'WITH moved AS ('
+        '    DELETE FROM messages_default WHERE created_at >= %L AND created_at < %L'
+        '    RETURNING id, conversation_id, role, content, created_at'
+        ') INSERT INTO %I (id, conversation_id, role, content, created_at) SELECT * FROM moved',
+        lower_bound, upper_bound, partition_name);
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    EXECUTE format(
+        'ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, upper_bound);
+    RAISE NOTICE 'Moved % rows from messages_default into %', moved, partition_name;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist from `since` through `months_ahead` months from now.
+-- By default this starts at the oldest month with rows in messages_default.
+CREATE OR REPLACE FUNCTION create_message_partitions(
+    months_ahead INTEGER DEFAULT 3, since TIMESTAMPTZ DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start TIMESTAMPTZ := COALESCE(
+        since, LEAST(NOW(), (SELECT MIN(created_at) FROM messages_default)));
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start < NOW() + make_interval(months => months_ahead + 1) LOOP
+        IF create_message_partition(month_start) THEN
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Scheduled maintenance, when pg_cron is installed; otherwise run
+-- `flask maintenance` from cron (see the deployment guide)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('create-message-partitions', '0 3 * * *',
+            'SELECT create_message_partitions(3)');
+        PERFORM cron.schedule('archive-inactive-conversations', '30 3 * * *',
+            'SELECT archive_inactive_conversations(90, 1000)');
+    END IF;
+END;
+$$;
+
+-- Catch up now in case rows already landed in messages_default
+SELECT create_message_partitions(3);
+
+COMMIT;